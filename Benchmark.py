@@ -0,0 +1,281 @@
+#Program:   Surplus Food Redistribution Benchmarks
+#Inputs:    Benchmark settings below
+#Outputs:   Timing and allocation statistics in the log file
+#Author:    Surja Sanyal
+#Date:      29 DEC 2020
+#Comments:  None
+
+
+
+
+##   Start of Code   ##
+
+
+#   Imports    #
+
+import os
+import sys
+import math
+import copy
+import time
+import random
+import datetime
+import traceback
+import subprocess
+import Food_Surplus as fs
+
+
+
+
+##  Global environment   ##
+
+#   Customize here  #
+AGENTS					= 5000					#Number								Agent requests per benchmark dataset
+REPEATS					= 3						#Number								Timed repetitions per setting
+SEED					= 2021					#Number								Random seed of the benchmark dataset
+ENGINES					= ["GREEDY", "RECEIVER_DA", "DONOR_DA", "MAXIMUM"]	#List									Matching engines compared
+ROUTINGS				= ["SINGLE", "CAPACITATED"]		#List									Volunteer routing modes compared
+SCRIPTS					= ["Food_Surplus", "Graph_Builder"]	#List										Scripts timed at start-up
+GENERATORS				= ["UNIFORM", "SCENARIO"]	#List									Agent request generators compared
+REACH_SEARCH			= ["OFF", "ON"]			#List									Sequential or parallel non-perishable reach search compared
+AVAILABILITY			= ["1X", "2X", "4X", "8X", "16X", "32X"]	#List									Volunteer availability levels swept independently and nested
+
+
+
+##  Function definitions    ##
+
+
+#   Print with lock    #
+def print_locked(*content, sep=" ", end="\n"):
+
+    fs.print_locked(*content, sep = sep, end = end)
+
+
+#	Run both food classes with the given settings	#
+def run_settings(C, PFD, PFR, NPFD, NPFR, V, settings):
+
+	C, PFD, PFR, NPFD, NPFR, V = copy.deepcopy((C, PFD, PFR, NPFD, NPFR, V))
+	c_PFD, c_NPFD = len(PFD), len(NPFD)
+	previous = {name: getattr(fs, name) for name in settings}
+	[setattr(fs, name, value) for name, value in settings.items()]
+
+	start = time.perf_counter()
+	Mp, PFD, PFR, Mnp, NPFD, NPFR, V = fs.match_food_classes(C, PFD, PFR, NPFD, NPFR, V)
+	elapsed = time.perf_counter() - start
+	fs.add_metric('runs_completed_total')
+
+	[setattr(fs, name, value) for name, value in previous.items()]
+
+	delivered = [the_tuple for the_tuple in Mp + Mnp if len(the_tuple) == 3]
+	used_volunteers = len(set([the_tuple[1] for the_tuple in delivered]))
+
+	return elapsed, 100 * (len(Mp) + len(Mnp))/max(c_PFD + c_NPFD, 1), len(delivered)/max(used_volunteers, 1)
+
+
+#	Benchmark script start-up on import time and slowest imports	#
+def benchmark_startup(repeats, scripts):
+
+	location = os.path.dirname(os.path.abspath(sys.argv[0]))
+
+	print_locked("\nSTART-UP:\t\t\t", repeats, "repeats")
+
+	for script in scripts:
+
+		timings, imports = [], {}
+
+		for repeat in range(repeats):
+
+			start = time.perf_counter()
+			result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + script], cwd = location, capture_output = True, text = True)
+			timings.append(time.perf_counter() - start)
+
+			#	Skip scripts that fail to import	#
+			if result.returncode != 0:
+				break
+
+			#	Cumulative microseconds of the script's own imports	#
+			for line in result.stderr.splitlines():
+
+				pieces = line.split("|")
+
+				if len(pieces) == 3 and pieces[2].startswith("   ") and not pieces[2].startswith("     ") and pieces[1].strip().isdigit():
+
+					imports[pieces[2].strip()] = min(imports.get(pieces[2].strip(), math.inf), int(pieces[1]))
+
+		if result.returncode != 0:
+			error = [line for line in result.stderr.strip().splitlines() if not line.startswith("import time:")]
+			print_locked(script + ":\t\t", "skipped, import failed with exit code", result.returncode, "(", error[-1] if error else "no output", ")")
+			continue
+
+		slowest = sorted(imports.items(), key = lambda item: -item[1])[:3]
+		print_locked(script + ":\t\t", round(min(timings), 4), "s best,", round(sum(timings)/len(timings), 4), "s mean ( slowest imports:",
+						", ".join([name + " " + str(round(micros/1e6, 3)) + " s" for name, micros in slowest]), ")")
+
+
+
+#	Benchmark matching engines on speed and allocation rate	#
+def benchmark_matching_engines(num_requests, repeats, engines):
+
+	random.seed(SEED)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(num_requests)
+
+	print_locked("\nMATCHING ENGINES:\t\t", num_requests, "agents,", repeats, "repeats")
+
+	for engine in engines:
+
+		timings, allocation = [], 0
+
+		for repeat in range(repeats):
+
+			elapsed, allocation, per_volunteer = run_settings(C, PFD, PFR, NPFD, NPFR, V, {'MATCHING': engine})
+			timings.append(elapsed)
+
+		print_locked(engine + ":\t\t\t", round(min(timings), 4), "s best,", round(sum(timings)/len(timings), 4), "s mean (", round(allocation, 2), "% allocated )")
+
+
+
+#	Benchmark volunteer routing modes on compute cost and deliveries per volunteer	#
+def benchmark_volunteer_routing(num_requests, repeats, routings):
+
+	random.seed(SEED)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(num_requests)
+
+	print_locked("\nVOLUNTEER ROUTING:\t\t", num_requests, "agents,", len(V), "volunteers,", repeats, "repeats")
+	deliveries = {}
+
+	for routing in routings:
+
+		timings, allocation, per_volunteer = [], 0, 0
+
+		for repeat in range(repeats):
+
+			elapsed, allocation, per_volunteer = run_settings(C, PFD, PFR, NPFD, NPFR, V, {'ROUTING': routing})
+			timings.append(elapsed)
+
+		deliveries[routing] = per_volunteer
+		print_locked(routing + ":\t\t\t", round(min(timings), 4), "s best,", round(sum(timings)/len(timings), 4), "s mean (", round(allocation, 2), "% allocated,", round(per_volunteer, 2), "deliveries per volunteer )")
+
+	#	Deliveries per volunteer against the first routing mode	#
+	for routing in routings[1:]:
+
+		print_locked(routing + " gain:\t\t", round(100 * (deliveries[routing]/max(deliveries[routings[0]], 1e-9) - 1), 2), "% deliveries per volunteer over", routings[0])
+
+
+
+#	Benchmark sequential against parallel non-perishable reach search	#
+def benchmark_reach_search(num_requests, repeats, modes):
+
+	random.seed(SEED)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(num_requests)
+
+	print_locked("\nPARALLEL REACH SEARCH:\t\t", num_requests, "agents,", repeats, "repeats")
+
+	for mode in modes:
+
+		timings, allocation = [], 0
+
+		for repeat in range(repeats):
+
+			elapsed, allocation, per_volunteer = run_settings(C, PFD, PFR, NPFD, NPFR, V, {'CONCURRENT': mode})
+			timings.append(elapsed)
+
+		print_locked(mode + ":\t\t\t\t", round(min(timings), 4), "s best,", round(sum(timings)/len(timings), 4), "s mean (", round(allocation, 2), "% allocated )")
+
+
+
+#	Benchmark generation and matching under uniform and clustered density	#
+def benchmark_generators(num_requests, repeats, generators):
+
+	previous = fs.GENERATOR
+
+	print_locked("\nGENERATORS:\t\t\t", num_requests, "agents,", repeats, "repeats")
+
+	for generator in generators:
+
+		fs.GENERATOR = generator
+		random.seed(SEED)
+		start = time.perf_counter()
+		C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(num_requests, save = False)
+		generation = time.perf_counter() - start
+		timings, allocation = [], 0
+
+		for repeat in range(repeats):
+
+			elapsed, allocation, per_volunteer = run_settings(C, PFD, PFR, NPFD, NPFR, V, {})
+			timings.append(elapsed)
+
+		print_locked(generator + ":\t\t\t", round(generation, 4), "s generation,", round(min(timings), 4), "s best,", round(sum(timings)/len(timings), 4), "s mean matching (", round(allocation, 2), "% allocated )")
+
+	fs.GENERATOR = previous
+
+
+
+#	Benchmark independent volunteer samples per level against the nested availability sweep	#
+def benchmark_availability(num_requests, repeats, levels):
+
+	random.seed(SEED)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(num_requests, save = False)
+	independent, nested = [], []
+
+	print_locked("\nAVAILABILITY LEVELS:\t\t", num_requests, "agents,", repeats, "repeats,", ", ".join(levels))
+
+	for repeat in range(repeats):
+
+		#	Fresh sample and matching per level	#
+		start = time.perf_counter()
+
+		for level in levels:
+
+			run_settings(C, PFD, PFR, NPFD, NPFR, random.sample(V, int(len(V) * round(fs.get_v_settings(level)/fs.get_v_settings('32X'), 5))), {})
+
+		independent.append(time.perf_counter() - start)
+
+		#	One volunteer order with nested prefixes	#
+		start = time.perf_counter()
+		fs.run_availability(*copy.deepcopy((C, PFD, PFR, NPFD, NPFR)), random.sample(V, len(V)), levels, save = False)
+		nested.append(time.perf_counter() - start)
+
+	print_locked("INDEPENDENT:\t\t\t", round(min(independent), 4), "s best,", round(sum(independent)/len(independent), 4), "s mean")
+	print_locked("NESTED:\t\t\t\t", round(min(nested), 4), "s best,", round(sum(nested)/len(nested), 4), "s mean")
+
+
+##  The main function   ##
+
+#   Main    #
+def main():
+
+	fs.start_metrics()
+	fs.set_metric('runs_planned', REPEATS * (len(ENGINES) + len(ROUTINGS) + len(GENERATORS) + len(REACH_SEARCH) + 2 * len(AVAILABILITY)))
+	benchmark_startup(REPEATS, SCRIPTS)
+	benchmark_matching_engines(AGENTS, REPEATS, ENGINES)
+	benchmark_volunteer_routing(AGENTS, REPEATS, ROUTINGS)
+	benchmark_generators(AGENTS, REPEATS, GENERATORS)
+	benchmark_reach_search(AGENTS, REPEATS, REACH_SEARCH)
+	benchmark_availability(AGENTS, REPEATS, AVAILABILITY)
+
+
+
+##  Call the main function  ##
+
+#   Initiation  #
+if __name__=="__main__":
+
+    try:
+
+        #   Start logging to file     #
+        print_locked('\n\n\n\n{:.{align}{width}}'.format("Execution Start at: "
+            + str(datetime.datetime.now()), align='<', width=70), end="\n\n")
+
+        print_locked("\n\nProgram Name:\n\n" + str(sys.argv[0].split("/")[-1]))
+
+        #   Call the main program   #
+        start = datetime.datetime.now()
+        main()
+        print_locked("\nProgram execution time:\t\t", datetime.datetime.now() - start, "hours\n")
+
+    except Exception:
+
+        print_locked(traceback.format_exc())
+
+
+##   End of Code   ##
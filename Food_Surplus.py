@@ -19,19 +19,30 @@ import sys
 import math
 import copy
 import time
-import psutil
+import zlib
+import json
+import heapq
+import atexit
+import bisect
+import shelve
+import pickle
 import shutil
 import random
+import sqlite3
+import hashlib
 import resource
 import datetime
 import traceback
 import itertools
+import threading
+import collections
 import numpy as np
 import multiprocessing
+import Log_Writer
 from textwrap import wrap
 from functools import partial
-import matplotlib.pyplot as plt
-from scipy.stats import truncnorm
+from multiprocessing import shared_memory
+from Log_Writer import print_locked, log_record, flush_log
 
 
 
@@ -43,11 +54,39 @@ AGENTS					= 5000					#Number								Default number of agent requests
 PAYLOAD_MAX				= 100					#Number								Volunteer payload limit in kilograms
 COORDINATE_MAX       	= 50					#Number								City start (at 0) to end limit in kilometers
 DAY_MAX			      	= 18					#Number								Day start (at 0) to end limit in hours
+GRID_CELL				= 5						#Number								Spatial index cell size in kilometers
+GENERATOR				= "UNIFORM"				#UNIFORM/SCENARIO					Uniform or clustered mealtime agent requests
+SCENARIO				= {"hotspots": 8, "spread": 2, "background": 20, "peaks": [3, 7, 13], "peak_spread": 1, "window": 2, "city": 1}	#Scenario	Hotspots per kind and their spread (km), uniform share (%), mealtime peaks, their spread and window (hours), layout seed
 SAVE					= "OFF"					#ON/OFF								Save data
+SHARED_MEMORY			= "ON"					#ON/OFF								Hand saved data to saver processes through shared memory
 SORTING					= "END"					#START/END							Receiver sorting
 PREFERENCE				= "ELIGIBLE"			#ORIGINAL/ELIGIBLE/UPDATED			Usage of preference lists
+ELIGIBILITY				= "BITSET"				#LIST/BITSET						Preference filtering over eligibility lists or packed bitsets
+MATCHING				= "GREEDY"				#GREEDY/RECEIVER_DA/DONOR_DA/MAXIMUM	Donor-receiver matching engine
+BOUND					= "OFF"					#ON/OFF								Report the maximum-cardinality allocation next to each run
+ROUTING					= "SINGLE"				#SINGLE/CAPACITATED					Volunteer per donor or capacitated multi-drop routes
+CONCURRENT				= "OFF"					#ON/OFF								Parallel reach search: list non-perishable volunteer reach during perishable matching
+DISTANCE				= "EUCLIDEAN"			#EUCLIDEAN/ROAD						Straight-line or road network travel distances
+ROAD_NETWORK_FILE		= "_road_network.txt"	#File name							Road edge list with lines "x1 y1 x2 y2 [length]"
+ROAD_CACHE_SIZE			= 10000					#Number								Road distance tables kept in memory
 VOLUNTEERS				= "32X"					#1X/2X/4X/8X/16X/32X				Volunteer availability (1/2/4/8/16/32) times donors
 MANIPULATION			= "ON"					#ON/OFF								Manipulation of preferences
+LOG_LEVEL				= "INFO"				#DEBUG/INFO/WARNING/ERROR			Lowest level of log records written
+METRICS					= "OFF"					#OFF/ENDPOINT/TERMINAL/BOTH			Live metrics on a local Prometheus text endpoint and a terminal progress line
+METRICS_PORT			= 9464					#Number								Local port of the metrics endpoint
+DAYS					= 1						#Number								Consecutive days simulated
+REPEAT_AGENTS			= 20					#Percentage							Agents recurring on the following day
+CHECKPOINT				= "OFF"					#ON/OFF								Periodic snapshots of matching and day progress
+CHECKPOINT_INTERVAL		= 500					#Number								Receivers matched between snapshots
+RESUME					= "OFF"					#ON/OFF								Resume from the last snapshot
+SEED					= None					#Number/None						Random seed of the run (None draws a fresh one)
+RESULT_STORE			= "OFF"					#ON/OFF								Append run results to the result store
+MEMOIZE					= "OFF"					#ON/OFF								Reuse matches of identical seeded runs
+CACHE_SIZE_MB			= 256					#Number								Memoized run cache size limit in megabytes
+STREAMING				= "OFF"					#ON/OFF								Out-of-core generation and matching from memory-mapped files
+MEMORY_BUDGET_MB		= 1024					#Number								Memory for agent chunks and eligibility tiles in megabytes
+SENSITIVITY				= {}					#Threshold: values					Threshold sweeps, e.g. {"Tl": [1, 5, 10], "Tpm": [10, 20, 40]}
+AVAILABILITY_SWEEP		= []					#Levels								Nested volunteer availability sweep, e.g. ["1X", "2X", "4X", "8X", "16X", "32X"]
 
 #	Thresholds	#
 To		= 0.25									#Overlap time (hours)
@@ -62,44 +101,325 @@ Tr		= 3										#Process advance start threshold for receivers (hours)
 Tw		= 10									#Match acceptance window (minutes)
 
 #   Do not change   #
-LOCK                = multiprocessing.Lock()								#Multiprocessing lock
 CPU_COUNT           = multiprocessing.cpu_count()							#Logical CPUs
-MEMORY              = math.ceil(psutil.virtual_memory().total/(1024.**3))	#RAM capacity
+MEMORY              = math.ceil(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')/(1024.**3))	#RAM capacity
 DATA_LOAD_LOCATION	= os.path.dirname(sys.argv[0]) + "/"					#Data load location
 DATA_STORE_LOCATION	= os.path.dirname(sys.argv[0]) + "/"					#Data store location
-
+ROAD_NETWORK		= None													#Loaded road network
+ROAD_CACHE			= collections.OrderedDict()								#Road distance tables in memory
+ROAD_DISK_CACHE		= None													#Road distance tables on disk
+AGENT_CODES			= {'agenttype': ['D', 'R', 'V'], 'ftype': ['', 'P', 'NP'],
+						'transtype': ['', 'MOTORED'], 'transac': ['', 'AC']}		#Agent attribute codes in shared memory
+SAVERS				= []													#Running saver processes and their shared memory
+MATCH_BOUNDS		= {}													#Maximum-cardinality matches of the last pass per food class
+METRICS_INTERVAL	= 0.5													#Seconds between metric updates sent by a process
+METRICS_QUEUE		= None													#Metric update queue
+METRICS_BUFFER		= {}													#Metric updates not yet sent by this process
+METRICS_SENT		= 0														#Last metric update sent by this process
+METRICS_STATE		= None													#Aggregated metrics
+MATCH_PHASES		= ['volunteers', 'preferences', 'matching', 'routing', 'done']	#Phases of a matching pass
+METRIC_TYPES		= {'runs_completed_total': ('counter', 'Simulation runs completed'), 'runs_planned': ('gauge', 'Simulation runs planned'),
+						'receivers_processed_total': ('counter', 'Receivers processed by matching'),
+						'pass_receivers': ('gauge', 'Receivers of the current matching pass'),
+						'pass_receivers_done': ('gauge', 'Receivers processed in the current matching pass'),
+						'match_phase': ('gauge', 'Current phase of each food class matching pass'),
+						'receivers_per_second': ('gauge', 'Receivers processed per second over the last 10 seconds'),
+						'eta_seconds': ('gauge', 'Estimated seconds left of the planned runs, or else of the current pass'),
+						'uptime_seconds': ('gauge', 'Seconds since metrics started'), 'worker_rss_bytes': ('gauge', 'Resident memory per process'),
+						'service_requests_total': ('counter', 'Matching service requests per operation')}	#Metric types and descriptions
+ENGINE_VERSION		= "2021.05-2"											#Matching engine version, invalidates memoized runs
+SETTING_NAMES		= ['AGENTS', 'PAYLOAD_MAX', 'COORDINATE_MAX', 'DAY_MAX', 'GRID_CELL', 'GENERATOR', 'SCENARIO', 'SORTING', 'PREFERENCE', 'MATCHING', 'ROUTING',
+						'BOUND', 'AVAILABILITY_SWEEP', 'DISTANCE', 'ROAD_NETWORK_FILE', 'VOLUNTEERS', 'MANIPULATION', 'DAYS', 'REPEAT_AGENTS',
+						'To', 'Tl', 'Tm', 'Ta', 'Tpm', 'Tpnm', 'Tnp', 'Td', 'Tr', 'Tw']				#Settings recorded with results
+RESULT_COLUMNS		= [('timestamp', 'TEXT'), ('seed', 'INTEGER'), ('dataset', 'TEXT'), ('day', 'INTEGER'), ('agents', 'INTEGER'),
+						('volunteers', 'TEXT'), ('volunteer_factor', 'INTEGER'), ('sorting', 'TEXT'), ('preference', 'TEXT'),
+						('matching', 'TEXT'), ('routing', 'TEXT'), ('distance', 'TEXT'), ('manipulation', 'TEXT'), ('settings', 'TEXT'),
+						('perishable_donors', 'INTEGER'), ('non_perishable_donors', 'INTEGER'), ('perishable_receivers', 'INTEGER'),
+						('non_perishable_receivers', 'INTEGER'), ('volunteer_count', 'INTEGER'), ('perishable_matched', 'INTEGER'),
+						('non_perishable_matched', 'INTEGER'), ('allocation', 'REAL'), ('perishable_allocation', 'REAL'),
+						('non_perishable_allocation', 'REAL'), ('manipulated', 'INTEGER'), ('gained', 'INTEGER'), ('lost', 'INTEGER'),
+						('same', 'INTEGER'), ('uncomparable', 'INTEGER'), ('seconds', 'REAL'), ('maximum_allocation', 'REAL')]		#Result store columns
+
+#   Log level and location of the shared log writer   #
+Log_Writer.LOG_LEVEL, Log_Writer.LOG_LOCATION = LOG_LEVEL, DATA_STORE_LOCATION
 
 
 
 ##  Function definitions    ##
 
 
-#   Print with lock    #
-def print_locked(*content, sep=" ", end="\n"):
+#	Count towards a metric	#
+def add_metric(name, value = 1, **labels):
 
-    store = DATA_STORE_LOCATION
-    
-    with open(store + "_Log_File.txt", "a") as log_file:
-    
-        try:
-        
-            with lock:
-            
-                print (*content, sep = sep, end = end)
-                print (*content, sep = sep, end = end, file=log_file)
+	if METRICS == 'OFF':
 
-        except Exception:
-        
-            with LOCK:
-            
-                print (*content, sep = sep, end = end)
-                print (*content, sep = sep, end = end, file=log_file)
+		return
+
+	key = (name, tuple(sorted(labels.items())))
+	METRICS_BUFFER[key] = ('counter', METRICS_BUFFER.get(key, ('counter', 0))[1] + value)
+	send_metrics()
+
+
+#	Set a metric gauge	#
+def set_metric(name, value, **labels):
+
+	if METRICS == 'OFF':
+
+		return
+
+	METRICS_BUFFER[(name, tuple(sorted(labels.items())))] = ('gauge', value)
+	send_metrics()
+
+
+#	Mark the current phase of a matching pass	#
+def record_phase(Food, phase, **fields):
+
+	log_record("DEBUG", "phase", food = Food, phase = phase, **fields)
+
+	for name in MATCH_PHASES:
+
+		set_metric('match_phase', int(name == phase), food = 'P' if Food == 'P' else 'NP', phase = name)
+
+	#	Phases can last long, report the change now	#
+	send_metrics(force = True)
+
+
+#	Get resident memory of this process	#
+def get_rss():
+
+	try:
+
+		with open("/proc/self/statm", "r") as fp:
+
+			return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+	except OSError:
+
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+#	Send buffered metric updates with this process's memory, at most every METRICS_INTERVAL	#
+def send_metrics(force = False):
+
+	global METRICS_SENT
+
+	if METRICS_QUEUE is None or (not force and time.monotonic() - METRICS_SENT < METRICS_INTERVAL):
+
+		return
+
+	METRICS_SENT = time.monotonic()
+	updates = dict(METRICS_BUFFER)
+	METRICS_BUFFER.clear()
+	METRICS_QUEUE.put((os.getpid(), get_rss(), updates))
+
+
+#	Run a worker process that reports its own metrics	#
+def run_worker(target, *args):
+
+	global METRICS_SENT
+
+	#	Updates buffered by the parent were copied in at fork	#
+	METRICS_BUFFER.clear()
+	METRICS_SENT = 0
+
+	try:
+
+		target(*args)
+
+	finally:
+
+		send_metrics(force = True)
+
+
+#	Start the metrics aggregator, endpoint and progress view	#
+def start_metrics():
+
+	global METRICS_QUEUE, METRICS_STATE
+
+	metrics_setting, port = METRICS, METRICS_PORT
+
+	if metrics_setting == 'OFF' or METRICS_QUEUE is not None:
+
+		return
+
+	METRICS_QUEUE = multiprocessing.Queue()
+	METRICS_STATE = {'lock': threading.Lock(), 'counters': {}, 'gauges': {}, 'workers': {}, 'start': time.time(),
+						'history': collections.deque(maxlen = 64)}
+	threading.Thread(target = aggregate_metrics, args = (METRICS_QUEUE, METRICS_STATE), daemon = True).start()
+
+	if metrics_setting in ['ENDPOINT', 'BOTH']:
+
+		import http.server
+
+		#	Prometheus text on GET /metrics	#
+		class MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+			def do_GET(self):
+
+				body = render_metrics(METRICS_STATE).encode()
+				self.send_response(200 if self.path in ['/', '/metrics'] else 404)
+				self.send_header("Content-Type", "text/plain; version=0.0.4")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+
+				pass
+
+		try:
+
+			server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+
+		#	Port held by another run, let the system pick a free one	#
+		except OSError as error:
+
+			log_record("WARNING", "metrics_port_unavailable", port = port, error = error.strerror)
+			server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MetricsHandler)
+
+		threading.Thread(target = server.serve_forever, daemon = True).start()
+		print_locked("\nMetrics endpoint:\t\t http://127.0.0.1:" + str(server.server_address[1]) + "/metrics")
+
+	if metrics_setting in ['TERMINAL', 'BOTH']:
+
+		threading.Thread(target = show_progress, args = (METRICS_STATE, ), daemon = True).start()
+		atexit.register(sys.stderr.write, "\n")
+
+	atexit.register(send_metrics, True)
+
+
+#	Aggregate metric updates of all processes	#
+def aggregate_metrics(metrics_queue, state):
+
+	while True:
+
+		#	The queue closes at interpreter exit	#
+		try:
+
+			pid, rss, updates = metrics_queue.get()
+
+		except (EOFError, OSError):
+
+			return
+
+		with state['lock']:
+
+			for key, (kind, value) in updates.items():
+
+				if kind == 'counter':
+
+					state['counters'][key] = state['counters'].get(key, 0) + value
+
+				else:
+
+					state['gauges'][key] = value
+
+			if any(key[0] == 'runs_completed_total' for key in updates):
+
+				state['completed_at'] = time.time()
+
+			state['workers'][pid] = (rss, time.time())
+			state['history'].append((time.time(), state['counters'].get(('receivers_processed_total', ()), 0)))
+
+
+#	Get last reported memory of processes still running	#
+def get_live_workers(state):
+
+	workers = {}
+
+	for pid, (rss, seen) in state['workers'].items():
+
+		try:
+
+			os.kill(pid, 0)
+			workers[pid] = rss
+
+		except OSError:
+
+			pass
+
+	return workers
+
+
+#	Get progress figures: processed receivers per second and seconds left	#
+def get_progress(state):
+
+	now = time.time()
+	recent = [(moment, count) for moment, count in state['history'] if now - moment <= 10]
+	rate = (recent[-1][1] - recent[0][1])/(recent[-1][0] - recent[0][0]) if len(recent) > 1 and recent[-1][0] > recent[0][0] else 0
+	planned, completed = state['gauges'].get(('runs_planned', ()), 0), state['counters'].get(('runs_completed_total', ()), 0)
+	receivers, done = state['gauges'].get(('pass_receivers', ()), 0), state['gauges'].get(('pass_receivers_done', ()), 0)
+
+	#	Time per completed run less the time into the current one, or the current pass at the current rate	#
+	if completed > 0 and planned > completed:
+
+		completed_at = state.get('completed_at', now)
+		eta = max(0, (completed_at - state['start'])/completed * (planned - completed) - (now - completed_at))
+
+	elif rate > 0 and receivers > done:
+
+		eta = (receivers - done)/rate
+
+	else:
+
+		eta = 0
+
+	return rate, eta
+
+
+#	Render metrics as Prometheus text	#
+def render_metrics(state):
+
+	lines = []
+
+	with state['lock']:
+
+		rate, eta = get_progress(state)
+		samples = [(name, labels, value) for (name, labels), value in list(state['counters'].items()) + list(state['gauges'].items())]
+		samples = samples + [('receivers_per_second', (), rate), ('eta_seconds', (), eta), ('uptime_seconds', (), time.time() - state['start'])]
+		samples = samples + [('worker_rss_bytes', (('pid', pid), ), rss) for pid, rss in get_live_workers(state).items()]
+
+	for name, labels, value in sorted(samples, key = lambda sample: (sample[0], sample[1])):
+
+		if len(lines) == 0 or not lines[-1].startswith("food_" + name + (" " if len(labels) == 0 else "{")):
+
+			kind, description = METRIC_TYPES.get(name, ('gauge', name.replace('_', ' ')))
+			lines.append("# HELP food_" + name + " " + description)
+			lines.append("# TYPE food_" + name + " " + kind)
+
+		label_text = "{" + ",".join([key + '="' + str(label) + '"' for key, label in labels]) + "}" if len(labels) > 0 else ""
+		lines.append("food_" + name + label_text + " " + str(value))
+
+	return "\n".join(lines) + "\n"
+
+
+#	Show a terminal progress line	#
+def show_progress(state):
+
+	while True:
+
+		time.sleep(1)
+
+		with state['lock']:
+
+			rate, eta = get_progress(state)
+			phases = [dict(labels) for (name, labels), value in state['gauges'].items() if name == 'match_phase' and value == 1]
+			planned, completed = state['gauges'].get(('runs_planned', ()), 0), state['counters'].get(('runs_completed_total', ()), 0)
+			processed = state['counters'].get(('receivers_processed_total', ()), 0)
+			workers = list(get_live_workers(state).values())
+
+		phase = ", ".join([labels['food'] + " " + labels['phase'] for labels in phases]) if len(phases) > 0 else "-"
+		sys.stderr.write("\r\033[K" + "runs " + str(completed) + "/" + str(planned) + " | " + phase + " | " + str(processed) + " receivers ("
+							+ str(round(rate, 1)) + "/s) | " + str(len(workers)) + " processes, " + str(round(sum(workers)/1024 ** 2)) + " MB RSS | ETA "
+							+ str(datetime.timedelta(seconds = round(eta))))
+		sys.stderr.flush()
 
 
 #   Load data option    #
 def get_agent_generation_options():
 
     print_locked("\nDo you want to generate fresh agent data (y/n)?: ", end="")
+    flush_log()
     agent_auto_generate = input()
     
     if agent_auto_generate.upper() != 'Y':
@@ -118,6 +438,7 @@ def get_agent_generation_options():
 def get_num_requests():
 
     print_locked("\nHow many agent requests do you want to create?: ", end="")
+    flush_log()
     num_requests = input()
 
     try:
@@ -152,6 +473,7 @@ class Agent:
 		self.pref		= pref			#Preference list
 		self.m_pref		= pref			#Updated preference list
 		self.vicinity	= -1			#Neighbourhood radius
+		self.route		= []			#Ordered pickups and drops
 
 	def get_details(self):
 	
@@ -182,471 +504,2830 @@ def save_matches(matches):
 		[fp.write(str(the_tuple) + "\n") for the_tuple in matches]
 
 
-#	Generate agent requests	#
-def generate_and_classify_agents(num_requests):
-
-	C, PFD, PFR, NPFD, NPFR, V = [], [], [], [], [], []
-	city_limits, working_hour_limits, max_payload = COORDINATE_MAX, DAY_MAX, PAYLOAD_MAX
-	
-	for i in range(num_requests):
-	
-		#	Generate agent attributes	#
-		agentid			= i
-		agenttype		= random.choices(('D', 'R', 'V'), weights = (2, 2, get_v_settings('32X')))[0]
-		startx			= random.choice(range(city_limits + 1))
-		starty			= random.choice(range(city_limits + 1))
-		startt			= random.choice(range(working_hour_limits))
-		endt			= random.choice(range(startt, working_hour_limits + 1))
-		
-		if agenttype == "V":
+#	Define shared table class	#
+class SharedTable:
 
-			endx		= random.choice(range(city_limits + 1))
-			endy		= random.choice(range(city_limits + 1))
-			transac		= random.choice(('AC', ''))
-			transtype	= random.choice(('MOTORED', ''))
-			amount		= random.choice(range(1, max_payload + 1))
-			ftype		= ''
-			pref		= random.sample(range(num_requests), random.choices(range(0, num_requests), weights = [i + 1 for i in range(num_requests)])[0])
+	def __init__(self, columns = None, handle = None):
+		self.blocks		= {}				#Shared memory blocks
+		self.arrays		= {}				#Array views over the blocks
+		self.owner		= handle is None	#Creator unlinks the blocks
 		
-		elif agenttype == "R":
+		if handle is None:
 		
-			endx		= -1
-			endy		= -1
-			transac		= ''
-			transtype	= ''
-			ftype		= random.choice(('P', 'NP'))
-			amount		= Tm
-			pref		= random.sample(range(num_requests), random.choices(range(0, num_requests), weights = [0.9999 ** (i + 1) for i in range(num_requests)])[0])
+			for name, array in columns.items():
+			
+				block = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+				self.blocks[name] = block
+				self.arrays[name] = np.ndarray(array.shape, dtype = array.dtype, buffer = block.buf)
+				self.arrays[name][...] = array
 		
 		else:
 		
-			endx		= -1
-			endy		= -1
-			transac		= ''
-			transtype	= ''
-			ftype		= random.choice(('P', 'NP'))
-			amount		= Tm
-			pref			= random.sample(range(num_requests), random.choices(range(0, num_requests), weights = [0.9 ** (i + 1) for i in range(num_requests)])[0])
-		
-		
-		#	Create agent request	#
-		C.append(Agent(agentid, agenttype, ftype, amount, startx, starty, startt, endt, pref, endx, endy, transtype, transac))
-		
-		#	Add to list	#
-		if agenttype == 'V':
-		
-			V.append(agentid)
-		
-		elif agenttype == 'D':
-		
-			if ftype == 'P':
-		
-				PFD.append(agentid)
-			
-			else:
+			for name, (block_name, shape, dtype) in handle.items():
 			
-				NPFD.append(agentid)
-		
-		else:
+				block = shared_memory.SharedMemory(name = block_name)
+				self.blocks[name] = block
+				self.arrays[name] = np.ndarray(shape, dtype = dtype, buffer = block.buf)
+
+	def handle(self):
+	
+		return {name: (self.blocks[name].name, array.shape, array.dtype.str) for name, array in self.arrays.items()}
+
+	def close(self):
+	
+		self.arrays = {}
 		
-			if ftype == 'P':
+		for block in self.blocks.values():
 		
-				PFR.append(agentid)
+			block.close()
 			
-			else:
+			if self.owner:
 			
-				NPFR.append(agentid)
+				block.unlink()
+		
+		self.blocks = {}
+
+	def __enter__(self):
 	
-	#	Save agent requests	#
-	if SAVE == 'ON':
+		return self
+
+	def __exit__(self, *exception):
+	
+		self.close()
+
+
+#	Get an integer or float column	#
+def get_column(values):
+
+	return np.array(values, dtype = np.int64 if all([type(value) is int for value in values]) else np.float64)
+
+
+#	Get agent columns and preference lists as arrays	#
+def get_agent_columns(C):
+
+	columns = {}
 	
-		multiprocessing.Process(target=save_agent_requests, args=(C, )).start()
+	for name in ['agentid', 'amount', 'startx', 'starty', 'startt', 'endt', 'endx', 'endy']:
 	
-	#	Return agent requests	#
-	return C, PFD, PFR, NPFD, NPFR, V
+		columns[name] = get_column([getattr(agent, name) for agent in C])
+	
+	for name, codes in AGENT_CODES.items():
+	
+		columns[name] = np.array([codes.index(getattr(agent, name)) for agent in C], dtype = np.int8)
+	
+	#	Preferences in compressed rows	#
+	columns['pref_offsets'] = np.zeros(len(C) + 1, dtype = np.int64)
+	columns['pref_offsets'][1:] = np.cumsum([len(agent.pref) for agent in C])
+	columns['pref_indices'] = np.fromiter(itertools.chain.from_iterable([agent.pref for agent in C]), dtype = np.int64, count = int(columns['pref_offsets'][-1]))
+	
+	return columns
 
 
-#	Read matches	#
-def get_matches():
+#	Place agent columns and preference lists in shared memory	#
+def share_agents(C):
 
-	matches = []
-	load = DATA_LOAD_LOCATION
+	return SharedTable(get_agent_columns(C))
+
+
+#	Get details of a shared agent	#
+def get_shared_details(arrays, i):
+
+	pref = arrays['pref_indices'][arrays['pref_offsets'][i]:arrays['pref_offsets'][i + 1]].tolist()
 	
-	#   Read agent matches    #
-	with open(load + "_matched_requests.txt", "r") as fp:
-    
-		for line in fp:
-		
-			line = line[1:-2]
-			parts = [convert(piece) for piece in re.split(", ", line)]
-			
-			if len(parts) > 2:
-			
-				matches.append((parts[0], parts[1], parts[2]))
-			
-			else:
-			
-				matches.append((parts[0], parts[1]))
+	return [arrays['agentid'][i].item(), AGENT_CODES['agenttype'][arrays['agenttype'][i]], AGENT_CODES['ftype'][arrays['ftype'][i]],
+			arrays['amount'][i].item(), arrays['startx'][i].item(), arrays['starty'][i].item(), arrays['startt'][i].item(),
+			arrays['endt'][i].item(), pref, arrays['endx'][i].item(), arrays['endy'][i].item(),
+			AGENT_CODES['transtype'][arrays['transtype'][i]], AGENT_CODES['transac'][arrays['transac'][i]]]
+
+
+#	Attach to shared agents	#
+def load_shared_agents(handle):
+
+	with SharedTable(handle = handle) as table:
 	
-	return matches
+		return [Agent(*details) for details in [get_shared_details(table.arrays, i) for i in range(len(table.arrays['agentid']))]]
 
 
-#	Read requests and classify into lists	#
-def read_and_classify_agents():
+#	Place matches in shared memory	#
+def share_matches(matches):
 
-	C, PFD, PFR, NPFD, NPFR, V = [], [], [], [], [], []
-	load = DATA_LOAD_LOCATION
+	table = np.full((len(matches), 3), -1, dtype = np.int64)
 	
-	#   Read agent requests    #
-	with open(load + "_agent_requests.txt", "r") as fp:
-    
-		for line in fp:
+	#	Pairs keep the last column empty	#
+	for i, the_tuple in enumerate(matches):
+	
+		table[i, :len(the_tuple)] = the_tuple
+	
+	return SharedTable({'matches': table})
+
+
+#	Save agent requests from shared memory	#
+def save_shared_agent_requests(handle):
+
+	store = DATA_STORE_LOCATION
+	
+	with SharedTable(handle = handle) as table:
+	
+		#   Write data  #
+		with open(store + "_agent_requests.txt", "w") as fp:
 		
-			line = line[1:-2]
-			parts = [piece for piece in re.split("\]|\[", line)]
-			
-			part_1 = [convert(piece) for piece in re.split(", ", parts[0])]
-			part_2 = [convert(piece) for piece in re.split(", ", parts[-1])]
-			
-			part_1 = [piece for piece in part_1 if piece is not None]
-			part_2 = [piece for piece in part_2 if piece is not None]
-			
-			if len(parts) == 2:
-			
-				pref   = []
-			
-			else:
-			
-				pref   = convert(parts[1])
-				
-				if type(pref) is not list:
-				
-					pref = [pref]
+			[fp.write(str(get_shared_details(table.arrays, i)) + "\n") for i in range(len(table.arrays['agentid']))]
+
+
+#	Save matches from shared memory	#
+def save_shared_matches(handle):
+
+	store = DATA_STORE_LOCATION
+	
+	with SharedTable(handle = handle) as table:
+	
+		#   Write data  #
+		with open(store + "_matched_requests.txt", "w") as fp:
+		
+			[fp.write(str(tuple(row[:2] if row[2] < 0 else row)) + "\n") for row in table.arrays['matches'].tolist()]
+
+
+#	Start a saver process	#
+def start_saver(target, data, shared_target, share):
+
+	if SHARED_MEMORY == 'ON':
+	
+		table = share(data)
+		process = multiprocessing.Process(target = run_worker, args = (shared_target, table.handle()))
+	
+	else:
+	
+		table = None
+		process = multiprocessing.Process(target = run_worker, args = (target, data))
+	
+	process.start()
+	
+	if len(SAVERS) == 0:
+	
+		atexit.register(finish_savers)
+	
+	SAVERS.append((process, table))
+
+
+#	Wait for saver processes and release their shared memory	#
+def finish_savers():
+
+	while len(SAVERS) > 0:
+	
+		process, table = SAVERS.pop(0)
+		process.join()
+		
+		if table is not None:
+		
+			table.close()
+
+
+#	Get digest of saved agent requests	#
+def get_dataset_digest():
+
+	load = DATA_LOAD_LOCATION
+
+	try:
+
+		with open(load + "_agent_requests.txt", "rb") as fp:
+
+			return hashlib.sha1(fp.read()).hexdigest()
+
+	except FileNotFoundError:
+
+		return None
+
+
+#	Save a checkpoint section as a compressed binary snapshot	#
+def save_checkpoint(section, state):
+
+	store = DATA_STORE_LOCATION
+
+	#   Write to a temporary file and swap it in    #
+	with open(store + "_checkpoint_" + section + ".tmp", "wb") as fp:
+
+		fp.write(zlib.compress(pickle.dumps(state, protocol = pickle.HIGHEST_PROTOCOL)))
+
+	os.replace(store + "_checkpoint_" + section + ".tmp", store + "_checkpoint_" + section + ".bin")
+
+
+#	Load a checkpoint section	#
+def load_checkpoint(section):
+
+	load = DATA_STORE_LOCATION
+
+	try:
+
+		with open(load + "_checkpoint_" + section + ".bin", "rb") as fp:
+
+			return pickle.loads(zlib.decompress(fp.read()))
+
+	except FileNotFoundError:
+
+		return None
+
+
+#	Remove all checkpoint sections	#
+def clear_checkpoint():
+
+	store = DATA_STORE_LOCATION
+
+	for file_name in os.listdir(store):
+
+		if file_name.startswith("_checkpoint_"):
+
+			os.remove(store + file_name)
+
+
+#	Get customizable settings	#
+def get_settings():
+
+	return {name: globals()[name] for name in SETTING_NAMES}
+
+
+#	Get digest of agent requests as saved	#
+def get_agents_digest(C):
+
+	digest = hashlib.sha1()
+
+	for agent in C:
+
+		digest.update((str(agent.get_details()) + "\n").encode())
+
+	return digest.hexdigest()
+
+
+#	Append a run to the result store	#
+def store_run_result(record):
+
+	store = DATA_STORE_LOCATION
+	connection = sqlite3.connect(store + "_results.db", timeout = 60)
+
+	try:
+
+		connection.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, "
+							+ ", ".join([name + " " + kind for name, kind in RESULT_COLUMNS]) + ")")
+
+		#	Stores from earlier versions lack the newer columns	#
+		existing = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+		[connection.execute("ALTER TABLE runs ADD COLUMN " + name + " " + kind) for name, kind in RESULT_COLUMNS if name not in existing]
+
+		connection.execute("CREATE INDEX IF NOT EXISTS runs_settings ON runs (volunteer_factor, sorting, preference, matching, routing)")
+		connection.execute("CREATE INDEX IF NOT EXISTS runs_dataset ON runs (dataset, seed)")
+		connection.execute("INSERT INTO runs (" + ", ".join(record) + ") VALUES (" + ", ".join(["?"] * len(record)) + ")",
+							list(record.values()))
+		connection.commit()
+
+	finally:
+
+		connection.close()
+
+
+#	Get content address of a run	#
+def get_run_key(dataset, seed, manipulated_ids):
+
+	parts = [ENGINE_VERSION, dataset, seed, json.dumps(get_settings(), sort_keys = True), sorted(manipulated_ids or [])]
+
+	if DISTANCE == 'ROAD':
+
+		parts.append(load_road_network()['digest'])
+
+	return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+#	Load memoized run results	#
+def load_cached_run(key):
+
+	load = DATA_STORE_LOCATION + "_run_cache/"
+
+	try:
+
+		with open(load + ENGINE_VERSION + "_" + key + ".bin", "rb") as fp:
+
+			cached = pickle.loads(zlib.decompress(fp.read()))
+
+	except FileNotFoundError:
+
+		return None
+
+	#   Mark as recently used    #
+	os.utime(load + ENGINE_VERSION + "_" + key + ".bin")
+
+	return cached
+
+
+#	Memoize run results with size-bounded eviction	#
+def store_cached_run(key, results):
+
+	store = DATA_STORE_LOCATION + "_run_cache/"
+	os.makedirs(store, exist_ok = True)
+
+	with open(store + key + ".tmp", "wb") as fp:
+
+		fp.write(zlib.compress(pickle.dumps(results, protocol = pickle.HIGHEST_PROTOCOL)))
+
+	os.replace(store + key + ".tmp", store + ENGINE_VERSION + "_" + key + ".bin")
+
+	#   Drop other engine versions, then least recently used entries    #
+	entries = []
+
+	for file_name in os.listdir(store):
+
+		if not file_name.endswith(".bin"):
+
+			continue
+
+		if not file_name.startswith(ENGINE_VERSION + "_"):
+
+			os.remove(store + file_name)
+
+		else:
+
+			entries.append((os.path.getmtime(store + file_name), os.path.getsize(store + file_name), file_name))
+
+	entries.sort()
+	total_size = sum([size for modified, size, file_name in entries])
+
+	while total_size > CACHE_SIZE_MB * 1024 ** 2 and len(entries) > 1:
+
+		modified, size, file_name = entries.pop(0)
+		os.remove(store + file_name)
+		total_size = total_size - size
+
+
+#	Generate agent requests	#
+def generate_and_classify_agents(num_requests, first_id = 0, save = True):
+
+	if GENERATOR == 'SCENARIO':
+	
+		return generate_scenario(num_requests, first_id, save)
+	
+	C, PFD, PFR, NPFD, NPFR, V = [], [], [], [], [], []
+	city_limits, working_hour_limits, max_payload = COORDINATE_MAX, DAY_MAX, PAYLOAD_MAX
+	
+	for i in range(num_requests):
+	
+		#	Generate agent attributes	#
+		agentid			= first_id + i
+		agenttype		= random.choices(('D', 'R', 'V'), weights = (2, 2, get_v_settings('32X')))[0]
+		startx			= random.choice(range(city_limits + 1))
+		starty			= random.choice(range(city_limits + 1))
+		startt			= random.choice(range(working_hour_limits))
+		endt			= random.choice(range(startt, working_hour_limits + 1))
+		
+		if agenttype == "V":
+
+			endx		= random.choice(range(city_limits + 1))
+			endy		= random.choice(range(city_limits + 1))
+			transac		= random.choice(('AC', ''))
+			transtype	= random.choice(('MOTORED', ''))
+			amount		= random.choice(range(1, max_payload + 1))
+			ftype		= ''
+			pref		= random.sample(range(num_requests), random.choices(range(0, num_requests), weights = [i + 1 for i in range(num_requests)])[0])
+		
+		elif agenttype == "R":
+		
+			endx		= -1
+			endy		= -1
+			transac		= ''
+			transtype	= ''
+			ftype		= random.choice(('P', 'NP'))
+			amount		= Tm
+			pref		= random.sample(range(num_requests), random.choices(range(0, num_requests), weights = [0.9999 ** (i + 1) for i in range(num_requests)])[0])
+		
+		else:
+		
+			endx		= -1
+			endy		= -1
+			transac		= ''
+			transtype	= ''
+			ftype		= random.choice(('P', 'NP'))
+			amount		= Tm
+			pref			= random.sample(range(num_requests), random.choices(range(0, num_requests), weights = [0.9 ** (i + 1) for i in range(num_requests)])[0])
+		
+		#	Offset preferences to this batch of agents	#
+		if first_id > 0:
+		
+			pref		= [first_id + agent for agent in pref]
+		
+		
+		#	Create agent request	#
+		C.append(Agent(agentid, agenttype, ftype, amount, startx, starty, startt, endt, pref, endx, endy, transtype, transac))
+		
+		#	Add to list	#
+		if agenttype == 'V':
+		
+			V.append(agentid)
+		
+		elif agenttype == 'D':
+		
+			if ftype == 'P':
+		
+				PFD.append(agentid)
+			
+			else:
+			
+				NPFD.append(agentid)
+		
+		else:
+		
+			if ftype == 'P':
+		
+				PFR.append(agentid)
+			
+			else:
+			
+				NPFR.append(agentid)
+	
+	#	Save agent requests	#
+	if SAVE == 'ON' and save:
+	
+		start_saver(save_agent_requests, C, save_shared_agent_requests, share_agents)
+	
+	#	Return agent requests	#
+	return C, PFD, PFR, NPFD, NPFR, V
+
+
+#	Get hotspot layout of the scenario city	#
+def get_scenario_hotspots(scenario, city_limits):
+
+	rng = np.random.default_rng(scenario['city'])
+	hotspots = {}
+
+	#	Restaurant and shelter hotspots of uneven size and popularity	#
+	for kind in ('D', 'R'):
+
+		hotspots[kind] = (rng.uniform(0, city_limits, size = (scenario['hotspots'], 2)),
+							scenario['spread'] * rng.uniform(0.5, 1.5, size = scenario['hotspots']),
+							rng.dirichlet(np.ones(scenario['hotspots'])))
+
+	#	Volunteers start around either	#
+	centres, spreads, weights = [np.concatenate((donor, receiver)) for donor, receiver in zip(hotspots['D'], hotspots['R'])]
+	hotspots['V'] = (centres, spreads, weights/2)
+
+	return hotspots
+
+
+#	Draw locations from a hotspot mixture over a uniform background	#
+def get_scenario_locations(rng, hotspots, count, background, city_limits):
+
+	centres, spreads, weights = hotspots
+	chosen = rng.choice(len(weights), size = count, p = weights)
+	locations = centres[chosen] + rng.normal(size = (count, 2)) * spreads[chosen, None]
+	uniform = rng.random(count) < background/100
+	locations[uniform] = rng.uniform(0, city_limits, size = (int(uniform.sum()), 2))
+
+	return np.round(np.clip(locations, 0, city_limits), 2)
+
+
+#	Draw mealtime availability windows at minute resolution	#
+def get_scenario_times(rng, count, peaks, peak_spread, window, working_hour_limits):
+
+	from scipy.stats import truncnorm
+
+	centres = np.asarray(peaks, dtype = float)[rng.integers(len(peaks), size = count)]
+	startt = truncnorm.rvs(-centres/peak_spread, (working_hour_limits - centres)/peak_spread, loc = centres, scale = peak_spread,
+							size = count, random_state = rng)
+	length = truncnorm.rvs(-2, np.inf, loc = window, scale = window/2, size = count, random_state = rng)
+	startt = np.round(startt * 60)/60
+
+	return startt, np.minimum(np.round((startt + length) * 60)/60, working_hour_limits)
+
+
+#	Generate clustered agent requests with mealtime arrival profiles	#
+def generate_scenario(num_requests, first_id = 0, save = True):
+
+	city_limits, working_hour_limits, max_payload, scenario = COORDINATE_MAX, DAY_MAX, PAYLOAD_MAX, SCENARIO
+	hotspots = get_scenario_hotspots(scenario, city_limits)
+	rng = np.random.default_rng(random.getrandbits(64))
+	n = num_requests
+
+	#	Agent and food types	#
+	weights = np.array([2, 2, get_v_settings('32X')], dtype = float)
+	types = rng.choice(np.array(['D', 'R', 'V']), size = n, p = weights/weights.sum())
+	ftypes = rng.choice(np.array(['P', 'NP']), size = n)
+
+	#	Start locations by kind, volunteers end anywhere	#
+	starts = np.empty((n, 2))
+
+	for kind in ('D', 'R', 'V'):
+
+		chosen = types == kind
+		starts[chosen] = get_scenario_locations(rng, hotspots[kind], int(chosen.sum()), scenario['background'], city_limits)
+
+	ends = np.round(rng.uniform(0, city_limits, size = (n, 2)), 2)
+	startt, endt = get_scenario_times(rng, n, scenario['peaks'], scenario['peak_spread'], scenario['window'], working_hour_limits)
+
+	#	Volunteer attributes	#
+	amounts = rng.integers(1, max_payload + 1, size = n)
+	transac = rng.choice(np.array(['AC', '']), size = n)
+	transtype = rng.choice(np.array(['MOTORED', '']), size = n)
+
+	#	Preference list lengths with the uniform generator's weights	#
+	lengths = np.zeros(n, dtype = int)
+	ranks = np.arange(1, n + 1)
+
+	for kind, rank_weights in (('V', ranks.astype(float)), ('R', 0.9999 ** ranks), ('D', 0.9 ** ranks)):
+
+		chosen = types == kind
+		lengths[chosen] = rng.choice(n, size = int(chosen.sum()), p = rank_weights/rank_weights.sum())
+
+	#	Create agent requests	#
+	C = []
+	types, ftypes, starts, ends, startt, endt = types.tolist(), ftypes.tolist(), starts.tolist(), ends.tolist(), startt.tolist(), endt.tolist()
+	amounts, transac, transtype, lengths = amounts.tolist(), transac.tolist(), transtype.tolist(), lengths.tolist()
+
+	for i in range(n):
+
+		pref = (rng.choice(n, size = lengths[i], replace = False) + first_id).tolist()
+
+		if types[i] == 'V':
+
+			C.append(Agent(first_id + i, 'V', '', amounts[i], starts[i][0], starts[i][1], startt[i], endt[i], pref,
+							ends[i][0], ends[i][1], transtype[i], transac[i]))
+
+		else:
+
+			C.append(Agent(first_id + i, types[i], ftypes[i], Tm, starts[i][0], starts[i][1], startt[i], endt[i], pref, -1, -1, '', ''))
+
+	PFD, PFR, NPFD, NPFR, V = classify_agents(C)
+
+	#	Save agent requests	#
+	if SAVE == 'ON' and save:
+
+		start_saver(save_agent_requests, C, save_shared_agent_requests, share_agents)
+
+	return C, PFD, PFR, NPFD, NPFR, V
+
+
+#	Read matches	#
+def get_matches():
+
+	matches = []
+	load = DATA_LOAD_LOCATION
+	
+	#   Read agent matches    #
+	with open(load + "_matched_requests.txt", "r") as fp:
+    
+		for line in fp:
+		
+			line = line[1:-2]
+			parts = [convert(piece) for piece in re.split(", ", line)]
+			
+			if len(parts) > 2:
+			
+				matches.append((parts[0], parts[1], parts[2]))
+			
+			else:
+			
+				matches.append((parts[0], parts[1]))
+	
+	return matches
+
+
+#	Read requests and classify into lists	#
+def read_and_classify_agents():
+
+	C, PFD, PFR, NPFD, NPFR, V = [], [], [], [], [], []
+	load = DATA_LOAD_LOCATION
+	
+	#   Read agent requests    #
+	with open(load + "_agent_requests.txt", "r") as fp:
+    
+		for line in fp:
+		
+			agent = parse_agent_request(line)
+			C.append(agent)
+			
+			if agent.agenttype == 'V':
+			
+				V.append(agent.agentid)
+			
+			elif agent.agenttype == 'D':
+			
+				if agent.ftype == 'P':
+			
+					PFD.append(agent.agentid)
+				
+				else:
+				
+					NPFD.append(agent.agentid)
+			
+			else:
+			
+				if agent.ftype == 'P':
+			
+					PFR.append(agent.agentid)
+				
+				else:
+				
+					NPFR.append(agent.agentid)
+	
+	return C, PFD, PFR, NPFD, NPFR, V
+
+
+#	Parse a saved agent request	#
+def parse_agent_request(line):
+
+	line = line[1:-2]
+	parts = [piece for piece in re.split("\]|\[", line)]
+	
+	part_1 = [convert(piece) for piece in re.split(", ", parts[0])]
+	part_2 = [convert(piece) for piece in re.split(", ", parts[-1])]
+	
+	part_1 = [piece for piece in part_1 if piece is not None]
+	part_2 = [piece for piece in part_2 if piece is not None]
+	
+	if len(parts) == 2:
+	
+		pref   = []
+	
+	else:
+	
+		pref   = convert(parts[1])
+		
+		if type(pref) is not list:
+		
+			pref = [pref]
+	
+	return Agent(part_1[0], part_1[1], part_1[2], part_1[3], part_1[4], part_1[5], part_1[6], part_1[7], 
+					pref, 
+					part_2[1], part_2[2], part_2[3])
+
+
+#   Convert read values to int, str or list    #
+def convert(some_value):
+
+	try:
+    
+		return int(some_value)
+        
+	except ValueError:
+	
+		if re.fullmatch("-?[0-9]+\.[0-9]+", some_value):
+		
+			return float(some_value)
+		
+		elif ',' not in some_value:
+    	
+			return some_value[1:-1]
+		
+		else:
+    	
+			return [int(element) for element in re.split("\[|, |\]", some_value)]
+
+
+#	Get volunteer availability settings	#
+def get_v_settings(setting):
+
+	if setting == '1X':
+	
+		return 2
+	
+	elif setting == '2X':
+	
+		return 4
+	
+	elif setting == '4X':
+	
+		return 8
+	
+	elif setting == '8X':
+	
+		return 16
+	
+	elif setting == '16X':
+	
+		return 32
+	
+	elif setting == '32X':
+	
+		return 64
+
+
+#	Get agent with matching agentid	#
+def get_agent(C, request_id):
+
+	corresponding_agent = [agent for agent in C if agent.agentid == request_id]
+	
+	return corresponding_agent[0]
+
+
+#	Get spatial index cell of a location	#
+def get_cell(x, y):
+
+	return (int(x // GRID_CELL), int(y // GRID_CELL))
+
+
+#	Check availability time overlap of two agents	#
+def is_time_overlap(agent_a, agent_b):
+
+	return (agent_a.startt < agent_b.endt and agent_b.startt < agent_a.endt
+			and (agent_b.endt - agent_a.startt >= To or agent_a.endt - agent_b.startt >= To))
+
+
+#	Get route position and off-route distance of a location	#
+def get_route_position(volunteer_agent, x, y):
+
+	route_x, route_y = volunteer_agent.endx - volunteer_agent.startx, volunteer_agent.endy - volunteer_agent.starty
+	route_length_squared = route_x ** 2 + route_y ** 2
+
+	if route_length_squared == 0:
+
+		position = 0
+
+	else:
+
+		position = ((x - volunteer_agent.startx) * route_x + (y - volunteer_agent.starty) * route_y) / route_length_squared
+		position = min(max(position, 0), 1)
+
+	off_routing_distance = math.sqrt((x - volunteer_agent.startx - position * route_x) ** 2
+									+ (y - volunteer_agent.starty - position * route_y) ** 2)
+
+	return position, off_routing_distance
+
+
+#	Get spatial index cells covered by a volunteer off-routing corridor	#
+def get_corridor_cells(volunteer_agent):
+
+	corridor = (Tl/100) * math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2)
+	low_x, low_y = get_cell(min(volunteer_agent.startx, volunteer_agent.endx) - corridor, min(volunteer_agent.starty, volunteer_agent.endy) - corridor)
+	high_x, high_y = get_cell(max(volunteer_agent.startx, volunteer_agent.endx) + corridor, max(volunteer_agent.starty, volunteer_agent.endy) + corridor)
+
+	return itertools.product(range(low_x, high_x + 1), range(low_y, high_y + 1))
+
+
+#	Index volunteer off-routing corridors by spatial cell	#
+def build_volunteer_grid(agents, V):
+
+	grid = {}
+
+	for volunteer in V:
+
+		for cell in get_corridor_cells(agents[volunteer]):
+
+			grid.setdefault(cell, set()).add(volunteer)
+
+	return grid
+
+
+#	Get route positions and detour cost of a pickup and a drop along a volunteer route	#
+def get_route_geometry(volunteer_agent, donor_agent, receiver_agent):
+
+	pickup, pickup_off_route = get_route_position(volunteer_agent, donor_agent.startx, donor_agent.starty)
+	drop, drop_off_route = get_route_position(volunteer_agent, receiver_agent.startx, receiver_agent.starty)
+	corridor = (Tl/100) * math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2)
+
+	#	Times the volunteer passes the pickup and the drop	#
+	pickup_time = volunteer_agent.startt + pickup * (volunteer_agent.endt - volunteer_agent.startt)
+	drop_time = volunteer_agent.startt + drop * (volunteer_agent.endt - volunteer_agent.startt)
+
+	if not (pickup <= drop and pickup_off_route <= corridor and drop_off_route <= corridor
+			and is_time_overlap(donor_agent, volunteer_agent) and is_time_overlap(receiver_agent, volunteer_agent)
+			and donor_agent.startt <= pickup_time <= donor_agent.endt and receiver_agent.startt <= drop_time <= receiver_agent.endt):
+
+		return None
+
+	return pickup, drop, 2 * (pickup_off_route + drop_off_route)
+
+
+#	Get route positions and cost of inserting a pickup and a drop into a volunteer route	#
+def get_insertion(volunteer_agent, donor_agent, receiver_agent, insertion_cache, version):
+
+	cached = insertion_cache.setdefault(volunteer_agent.agentid, {}).get((donor_agent.agentid, receiver_agent.agentid))
+
+	#	Geometry is fixed per volunteer, the payload check holds until the route changes	#
+	if cached is not None and cached[1] == version:
+
+		return cached[2]
+
+	geometry = cached[0] if cached is not None else get_route_geometry(volunteer_agent, donor_agent, receiver_agent)
+	insertion = geometry
+
+	if geometry is not None:
+
+		#	Payload carried between pickup and drop	#
+		pickup, drop, cost = geometry
+		capacity = volunteer_agent.amount / (1 + Ta/100)
+		load, peak_load = 0, 0
+
+		for position, agentid, change in volunteer_agent.route:
+
+			if position <= pickup:
+
+				load = load + change
+				peak_load = load
+
+			elif position <= drop:
+
+				load = load + change
+				peak_load = max(peak_load, load)
+
+		if peak_load + donor_agent.amount > capacity:
+
+			insertion = None
+
+	insertion_cache[volunteer_agent.agentid][(donor_agent.agentid, receiver_agent.agentid)] = (geometry, version, insertion)
+
+	return insertion
+
+
+#	Get a volunteer for a single trip, preferring volunteers already delivering	#
+def get_single_volunteer(agents, the_tuple, available, delivering):
+
+	donor_agent, receiver_agent = agents[the_tuple[0]], agents[the_tuple[-1]]
+	Food, single = 'P' if donor_agent.ftype == 'P' else '', the_tuple[1] if len(the_tuple) == 3 else None
+	candidates = sorted(delivering, key = lambda volunteer: (-delivering[volunteer], volunteer)) + ([single] if single is not None else [])
+
+	for volunteer in candidates:
+
+		volunteer_agent = agents[volunteer]
+
+		#	Same reach, payload and vicinity checks as the single assignment	#
+		if (volunteer in available and volunteer_agent.amount >= (1 + Ta/100) * donor_agent.amount
+			and (volunteer == single or (volunteer_reaches(donor_agent, volunteer_agent)
+				and get_distance(donor_agent.startx, donor_agent.starty, receiver_agent.startx, receiver_agent.starty, donor_agent.vicinity)
+					<= min(donor_agent.vicinity, get_volunteer_vicinity(volunteer_agent, Food))))):
+
+			return volunteer
+
+	return None
+
+
+#	Get version of a volunteer route and payload	#
+def get_route_version(volunteer_agent, route_versions):
+
+	return (route_versions.get(volunteer_agent.agentid, 0), len(volunteer_agent.route), volunteer_agent.amount)
+
+
+#	Assign matched pairs to capacitated multi-drop volunteer routes	#
+def route_volunteers(agents, M, V, indexes = None):
+
+	if indexes is None:
+
+		grid, volunteer_prefs, insertion_cache, route_versions = build_volunteer_grid(agents, V), {}, {}, {}
+
+	else:
+
+		grid, volunteer_prefs, insertion_cache, route_versions = indexes['volunteer_grid'], indexes['volunteer_prefs'], indexes['insertions'], indexes['route_versions']
+
+	available = set(V)
+	routed_M, delivering = [], {}
+
+	for the_tuple in M:
+
+		donor_agent, receiver_agent = agents[the_tuple[0]], agents[the_tuple[-1]]
+
+		if receiver_agent.agenttype != 'R':
+
+			routed_M.append(the_tuple)
+			continue
+
+		#	Volunteers whose corridors cover both pickup and drop cells	#
+		candidates = grid.get(get_cell(donor_agent.startx, donor_agent.starty), set()) & grid.get(get_cell(receiver_agent.startx, receiver_agent.starty), set()) & available
+		best_volunteer, best_key, best_insertion = None, None, None
+
+		for volunteer in candidates:
+
+			volunteer_agent = agents[volunteer]
+
+			if volunteer not in volunteer_prefs:
+
+				volunteer_prefs[volunteer] = set(volunteer_agent.m_pref)
+
+			if len(volunteer_prefs[volunteer]) != 0 and donor_agent.agentid not in volunteer_prefs[volunteer]:
+
+				continue
+
+			insertion = get_insertion(volunteer_agent, donor_agent, receiver_agent, insertion_cache, get_route_version(volunteer_agent, route_versions))
+
+			#	Prefer volunteers already on the road, then the cheapest detour	#
+			if insertion is not None and (best_key is None or (len(volunteer_agent.route) == 0, insertion[2], volunteer) < best_key):
+
+				best_volunteer, best_key, best_insertion = volunteer, (len(volunteer_agent.route) == 0, insertion[2], volunteer), insertion
+
+		#	No route fits, fall back to a single trip	#
+		if best_volunteer is None:
+
+			volunteer = get_single_volunteer(agents, the_tuple, available, delivering)
+
+			if volunteer is None:
+
+				routed_M.append((donor_agent.agentid, receiver_agent.agentid))
+				continue
+
+			volunteer_agent = agents[volunteer]
+			route_versions[volunteer] = route_versions.get(volunteer, 0) + 1
+			delivering[volunteer] = delivering.get(volunteer, 0) + 1
+			routed_M.append((donor_agent.agentid, volunteer, receiver_agent.agentid))
+
+			#	Use up volunteer payload as a single assignment does	#
+			if not charge_volunteer(volunteer_agent):
+
+				available.discard(volunteer)
+
+			continue
+
+		pickup, drop, cost = best_insertion
+		route = agents[best_volunteer].route
+		route.extend([(pickup, donor_agent.agentid, donor_agent.amount), (drop, receiver_agent.agentid, -donor_agent.amount)])
+		route.sort(key=lambda x: (x[0], -x[2]))
+		route_versions[best_volunteer] = route_versions.get(best_volunteer, 0) + 1
+		delivering[best_volunteer] = delivering.get(best_volunteer, 0) + 1
+		routed_M.append((donor_agent.agentid, best_volunteer, receiver_agent.agentid))
+
+	return routed_M
+
+
+#	Load road network edge list	#
+def load_road_network():
+
+	global ROAD_NETWORK
+
+	if ROAD_NETWORK is not None:
+
+		return ROAD_NETWORK
+
+	load = DATA_LOAD_LOCATION
+	nodes, adjacency = {}, {}
+
+	#   Read edges as 'x1 y1 x2 y2 [length]'    #
+	with open(load + ROAD_NETWORK_FILE, "rb") as fp:
+
+		network_bytes = fp.read()
+
+	for line in network_bytes.decode().splitlines():
+
+		pieces = line.split('#')[0].split()
+
+		if len(pieces) < 4:
+
+			continue
+
+		ends = []
+
+		for x, y in ((float(pieces[0]), float(pieces[1])), (float(pieces[2]), float(pieces[3]))):
+
+			if (x, y) not in nodes:
+
+				nodes[(x, y)] = len(nodes)
+				adjacency[nodes[(x, y)]] = []
+
+			ends.append(nodes[(x, y)])
+
+		if len(pieces) > 4:
+
+			length = float(pieces[4])
+
+		else:
+
+			length = math.sqrt((float(pieces[0]) - float(pieces[2])) ** 2 + (float(pieces[1]) - float(pieces[3])) ** 2)
+
+		adjacency[ends[0]].append((ends[1], length))
+		adjacency[ends[1]].append((ends[0], length))
+
+	#	Snapping needs at least one road node	#
+	if len(nodes) == 0:
+
+		raise ValueError("Road network " + load + ROAD_NETWORK_FILE + " has no edges, add edges or set DISTANCE = \"EUCLIDEAN\"")
+
+	grid = {}
+
+	for (x, y), node in nodes.items():
+
+		grid.setdefault(get_cell(x, y), []).append((node, x, y))
+
+	ROAD_NETWORK = {'adjacency': adjacency, 'grid': grid, 'snapped': {},
+					'cells': [min(cell[0] for cell in grid), max(cell[0] for cell in grid), min(cell[1] for cell in grid), max(cell[1] for cell in grid)],
+					'digest': hashlib.sha1(network_bytes).hexdigest()[:16]}
+
+	return ROAD_NETWORK
+
+
+#	Snap a location to its nearest road node	#
+def snap_to_road(x, y):
+
+	network = load_road_network()
+
+	if (x, y) in network['snapped']:
+
+		return network['snapped'][(x, y)]
+
+	cell_x, cell_y = get_cell(x, y)
+	min_x, max_x, min_y, max_y = network['cells']
+	rings = max(abs(cell_x - min_x), abs(cell_x - max_x), abs(cell_y - min_y), abs(cell_y - max_y))
+	best = (-1, math.inf)
+
+	#	Search rings of cells until no closer node can exist	#
+	for ring in range(rings + 1):
+
+		if (ring - 1) * GRID_CELL > best[1]:
+
+			break
+
+		for cell in itertools.product(range(cell_x - ring, cell_x + ring + 1), range(cell_y - ring, cell_y + ring + 1)):
+
+			if max(abs(cell[0] - cell_x), abs(cell[1] - cell_y)) != ring:
+
+				continue
+
+			for node, node_x, node_y in network['grid'].get(cell, []):
+
+				snap_distance = math.sqrt((x - node_x) ** 2 + (y - node_y) ** 2)
+
+				if snap_distance < best[1]:
+
+					best = (node, snap_distance)
+
+	network['snapped'][(x, y)] = best
+
+	return best
+
+
+#	Road distances from a source node truncated at a cutoff	#
+def bounded_dijkstra(adjacency, source, cutoff):
+
+	distances = {}
+	heap = [(0, source)]
+
+	while len(heap) > 0:
+
+		distance, node = heapq.heappop(heap)
+
+		if node in distances or distance > cutoff:
+
+			continue
+
+		distances[node] = distance
+
+		for neighbour, length in adjacency[node]:
+
+			if neighbour not in distances and distance + length <= cutoff:
+
+				heapq.heappush(heap, (distance + length, neighbour))
+
+	return distances
+
+
+#	Get cached road distances from a node	#
+def get_road_distances(node, cutoff):
+
+	global ROAD_DISK_CACHE
+
+	network = load_road_network()
+
+	#	Memory cache, least recently used evicted first	#
+	if node in ROAD_CACHE and ROAD_CACHE[node][0] >= cutoff:
+
+		ROAD_CACHE.move_to_end(node)
+
+		return ROAD_CACHE[node][1]
+
+	#	Disk cache shared across runs	#
+	if ROAD_DISK_CACHE is None:
+
+		ROAD_DISK_CACHE = shelve.open(DATA_STORE_LOCATION + "_road_distance_cache")
+		atexit.register(ROAD_DISK_CACHE.close)
+
+	key = network['digest'] + ":" + str(node)
+	cached = ROAD_DISK_CACHE.get(key)
+
+	if cached is None or cached[0] < cutoff:
+
+		cached = (cutoff, bounded_dijkstra(network['adjacency'], node, cutoff))
+		ROAD_DISK_CACHE[key] = cached
+
+	ROAD_CACHE[node] = cached
+
+	if len(ROAD_CACHE) > ROAD_CACHE_SIZE:
+
+		ROAD_CACHE.popitem(last=False)
+
+	return cached[1]
+
+
+#	Get travel distance between two locations	#
+def get_distance(x1, y1, x2, y2, cutoff = math.inf):
+
+	if DISTANCE != 'ROAD':
+
+		return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+
+	node_1, snap_1 = snap_to_road(x1, y1)
+	node_2, snap_2 = snap_to_road(x2, y2)
+
+	if snap_1 + snap_2 > cutoff:
+
+		return math.inf
+
+	return snap_1 + get_road_distances(node_1, cutoff - snap_1).get(node_2, math.inf) + snap_2
+
+
+#	Classify agents into food and volunteer lists	#
+def classify_agents(C):
+
+	PFD, PFR, NPFD, NPFR, V = [], [], [], [], []
+
+	for agent in C:
+
+		if agent.agenttype == 'V':
+
+			V.append(agent.agentid)
+
+		elif agent.agenttype == 'D':
+
+			(PFD if agent.ftype == 'P' else NPFD).append(agent.agentid)
+
+		else:
+
+			(PFR if agent.ftype == 'P' else NPFR).append(agent.agentid)
+
+	return PFD, PFR, NPFD, NPFR, V
+
+
+#	Build agent, volunteer corridor and volunteer preference indexes	#
+def build_indexes(C, V):
+
+	agents = {agent.agentid: agent for agent in C}
+
+	return {'agents': agents, 'volunteer_grid': build_volunteer_grid(agents, V), 'volunteer_prefs': {}, 'insertions': {}, 'route_versions': {}}
+
+
+#	Update indexes with arriving and departing agents	#
+def update_indexes(indexes, added, removed):
+
+	agents, grid = indexes['agents'], indexes['volunteer_grid']
+
+	for agentid in removed:
+
+		agent = agents.pop(agentid)
+		indexes['volunteer_prefs'].pop(agentid, None)
+		indexes['insertions'].pop(agentid, None)
+
+		if agent.agenttype == 'V':
+
+			for cell in get_corridor_cells(agent):
+
+				grid.get(cell, set()).discard(agentid)
+
+	for agent in added:
+
+		agents[agent.agentid] = agent
+
+		if agent.agenttype == 'V':
+
+			for cell in get_corridor_cells(agent):
+
+				grid.setdefault(cell, set()).add(agent.agentid)
+
+
+#	Simulate following days with carried over agents	#
+def simulate_days(C, NPFD, V, num_requests, days, record = None):
+
+	v_setting, repeat_setting, checkpoint_settings = VOLUNTEERS, REPEAT_AGENTS, CHECKPOINT
+	snapshot = load_checkpoint('days') if RESUME == 'ON' else None
+	first_day = 2
+	
+	#	Resume after the last completed day	#
+	if snapshot is not None:
+	
+		C, NPFD, V, next_id, first_day = snapshot['C'], snapshot['NPFD'], snapshot['V'], snapshot['next_id'], snapshot['day'] + 1
+		random.setstate(snapshot['random'])
+	
+	indexes = build_indexes(C, V)
+	agents = indexes['agents']
+	next_id = max(agents) + 1 if snapshot is None else next_id
+
+	for day in range(first_day, days + 1):
+
+		#	Carry unmatched non-perishable stock	#
+		carried = [agents[donor] for donor in NPFD]
+		carried_ids, available = set(NPFD), set(V)
+
+		#	Volunteers keep the capacity left after today's routes	#
+		for volunteer in V:
+
+			volunteer_agent = agents[volunteer]
+			volunteer_agent.amount = volunteer_agent.amount - sum([change for position, agentid, change in volunteer_agent.route if change > 0])
+
+		#	Recurring donors, receivers and volunteers with capacity left	#
+		returning = [agent for agent in C if agent.agentid not in carried_ids
+					and (agent.agenttype != 'V' or (agent.agentid in available and agent.amount >= (1 + Ta/100) * Tm))]
+		recurring = random.sample(returning, int(len(returning) * repeat_setting/100))
+
+		for agent in recurring:
+
+			if agent.agenttype != 'V':
+
+				agent.amount = Tm
+
+		for agent in carried + recurring:
+
+			agent.m_pref = agent.pref
+			agent.vicinity = -1
+			agent.route = []
+
+		#	Fresh requests of the day	#
+		fresh, PFD, PFR, NPFD, NPFR, fresh_V = generate_and_classify_agents(num_requests, first_id = next_id)
+		next_id = next_id + num_requests
+		fresh_V = set(random.sample(fresh_V, int(len(fresh_V) * round(get_v_settings(v_setting)/get_v_settings('32X'), 5))))
+		fresh = [agent for agent in fresh if agent.agenttype != 'V' or agent.agentid in fresh_V]
+
+		#	Update indexes with the day's churn only	#
+		staying = set([agent.agentid for agent in carried + recurring])
+		update_indexes(indexes, fresh, [agentid for agentid in list(agents) if agentid not in staying])
+		C = carried + recurring + fresh
+		PFD, PFR, NPFD, NPFR, V = classify_agents(C)
+		c_PFD, c_NPFD = len(PFD), len(NPFD)
+
+		#	Eligibility pairs kept across days, only arrivals are indexed	#
+		if 'sensitivity' not in indexes:
+
+			indexes['sensitivity'] = {'P': build_sensitivity_index(C, PFD, PFR, V, {}), '': build_sensitivity_index(C, NPFD, NPFR, V, {})}
+
+		else:
+
+			refresh_sensitivity_index(indexes['sensitivity']['P'], agents, PFD, PFR, V)
+			refresh_sensitivity_index(indexes['sensitivity'][''], agents, NPFD, NPFR, V)
+
+		#	Match the day	#
+		day_start = time.perf_counter()
+		Mp, PFD, PFR, Mnp, NPFD, NPFR, V = match_food_classes(C, PFD, PFR, NPFD, NPFR, V, indexes)
+		maximum = 100 * (MATCH_BOUNDS['P'] + MATCH_BOUNDS[''])/max(c_PFD + c_NPFD, 1) if len(MATCH_BOUNDS) == 2 else None
+
+		print_locked("Day " + str(day) + ":\t\t\t\t", len(Mp) + len(Mnp), "/", c_PFD + c_NPFD, "(", round(100 * (len(Mp) + len(Mnp))/max(c_PFD + c_NPFD, 1), 2), "% )",
+					"carried:", len(carried), "recurring:", len(recurring), "fresh:", len(fresh),
+					*(["maximum:", round(maximum, 2), "%"] if maximum is not None else []))
+		add_metric('runs_completed_total')
+		
+		#	Store day results	#
+		if record is not None:
+		
+			store_run_result(dict(record, timestamp = str(datetime.datetime.now()), day = day, agents = len(C),
+								perishable_donors = c_PFD, non_perishable_donors = c_NPFD, perishable_receivers = len(PFR),
+								non_perishable_receivers = len(NPFR), volunteer_count = len(V), perishable_matched = len(Mp),
+								non_perishable_matched = len(Mnp), allocation = 100 * (len(Mp) + len(Mnp))/max(c_PFD + c_NPFD, 1),
+								perishable_allocation = 100 * len(Mp)/max(c_PFD, 1), non_perishable_allocation = 100 * len(Mnp)/max(c_NPFD, 1),
+								manipulated = None, gained = None, lost = None, same = None, uncomparable = None,
+								seconds = time.perf_counter() - day_start, maximum_allocation = maximum))
+		
+		#	Checkpoint day progress	#
+		if checkpoint_settings == 'ON':
+		
+			save_checkpoint('days', {'day': day, 'C': C, 'NPFD': NPFD, 'V': V, 'next_id': next_id, 'random': random.getstate()})
+
+
+#	Index pairs of a food class for threshold sensitivity sweeps (volunteers of the pool can join later)	#
+def build_sensitivity_index(C, D, R, V, sweeps, pool = None):
+
+	agents = {agent.agentid: agent for agent in C}
+	pool = V if pool is None else pool
+	max_tl = max([Tl] + list(sweeps.get('Tl', [])))
+	lengths = {volunteer: math.sqrt((agents[volunteer].startx - agents[volunteer].endx) ** 2 + (agents[volunteer].starty - agents[volunteer].endy) ** 2) for volunteer in pool}
+	max_vicinity = max([Tpm, Tpnm, Tnp] + [value for name in ['Tpm', 'Tpnm', 'Tnp'] for value in sweeps.get(name, [])] + [int(length) for length in lengths.values()])
+	index = {'volunteers': {donor: [] for donor in D}, 'receivers': {donor: ([], []) for donor in D}, 'cursors': {donor: 0 for donor in D}, 'lengths': lengths,
+				'order': {volunteer: i for i, volunteer in enumerate(pool)}, 'max_tl': max_tl, 'max_vicinity': max_vicinity, 'indexed_receivers': set(R)}
+	add_sensitivity_volunteers(index, agents, D, V)
+	add_sensitivity_receivers(index, agents, D, R)
+	
+	return index
+
+
+#	Add receivers to the donor pairs of a sensitivity index	#
+def add_sensitivity_receivers(index, agents, D, R):
+
+	receiver_sort_settings, max_vicinity = SORTING, index['max_vicinity']
+	
+	#	Receivers by distance	#
+	for donor in D:
+	
+		donor_agent = agents[donor]
+		distances, receivers = index['receivers'][donor]
+		pairs = list(zip(distances, receivers))
+		
+		for receiver in R:
+		
+			receiver_agent = agents[receiver]
+			
+			if ((receiver_sort_settings == 'START' and donor_agent.endt < receiver_agent.startt)
+				or (receiver_sort_settings == 'END' and donor_agent.endt < receiver_agent.endt)):
+			
+				distance = get_distance(donor_agent.startx, donor_agent.starty, receiver_agent.startx, receiver_agent.starty, max_vicinity)
+				
+				if distance <= max_vicinity:
+				
+					pairs.append((distance, receiver))
+		
+		pairs.sort()
+		index['receivers'][donor] = ([distance for distance, receiver in pairs], [receiver for distance, receiver in pairs])
+
+
+#	Bring a sensitivity index to the live agents of a day, indexing only the arrivals	#
+def refresh_sensitivity_index(index, agents, D, R, V):
+
+	live_donors, live_receivers, live_volunteers = set(D), set(R), set(V)
+	new_volunteers = [volunteer for volunteer in V if volunteer not in index['lengths']]
+	new_receivers = [receiver for receiver in R if receiver not in index['indexed_receivers']]
+	
+	#	Departed agents leave the pairs	#
+	for donor in list(index['volunteers']):
+	
+		if donor not in live_donors:
+		
+			del index['volunteers'][donor], index['receivers'][donor], index['cursors'][donor]
+		
+		else:
+		
+			distances, receivers = index['receivers'][donor]
+			index['volunteers'][donor] = [pair for pair in index['volunteers'][donor] if pair[3] in live_volunteers]
+			index['receivers'][donor] = ([distance for distance, receiver in zip(distances, receivers) if receiver in live_receivers],
+											[receiver for receiver in receivers if receiver in live_receivers])
+			index['cursors'][donor] = 0
+	
+	index['lengths'] = {volunteer: length for volunteer, length in index['lengths'].items() if volunteer in live_volunteers}
+	index['lengths'].update({volunteer: math.sqrt((agents[volunteer].startx - agents[volunteer].endx) ** 2 + (agents[volunteer].starty - agents[volunteer].endy) ** 2)
+							for volunteer in new_volunteers})
+	index['order'] = {volunteer: i for i, volunteer in enumerate(V)}
+	index['indexed_receivers'] = live_receivers
+	staying = list(index['volunteers'])
+	new_donors = [donor for donor in D if donor not in index['volunteers']]
+	
+	for donor in new_donors:
+	
+		index['volunteers'][donor], index['receivers'][donor], index['cursors'][donor] = [], ([], []), 0
+	
+	#	A longer volunteer route widens the vicinity every donor may reach	#
+	max_vicinity = max([index['max_vicinity']] + [int(index['lengths'][volunteer]) for volunteer in new_volunteers])
+	rebuilt = staying if max_vicinity > index['max_vicinity'] else []
+	index['max_vicinity'] = max_vicinity
+	
+	for donor in rebuilt:
+	
+		index['receivers'][donor] = ([], [])
+	
+	#	New pairs only: staying donors with arrivals, new donors with everyone	#
+	add_sensitivity_volunteers(index, agents, staying, new_volunteers)
+	add_sensitivity_volunteers(index, agents, new_donors, V)
+	add_sensitivity_receivers(index, agents, [donor for donor in staying if donor not in rebuilt], new_receivers)
+	add_sensitivity_receivers(index, agents, new_donors + rebuilt, R)
+
+
+#	Add volunteers to the donor pairs of a sensitivity index	#
+def add_sensitivity_volunteers(index, agents, D, V):
+
+	lengths, max_tl = index['lengths'], index['max_tl']
+	
+	#	Volunteers by the off-routing threshold they need	#
+	for donor in D:
+	
+		donor_agent = agents[donor]
+		pairs = index['volunteers'][donor]
+		
+		for volunteer in V:
+		
+			volunteer_agent = agents[volunteer]
+			off_routing_limit = (max_tl/100) * lengths[volunteer]
+			
+			if not (donor_agent.startt < volunteer_agent.endt and volunteer_agent.startt < donor_agent.endt
+					and (donor_agent.agentid in volunteer_agent.m_pref or len(volunteer_agent.m_pref) == 0)):
+			
+				continue
+			
+			distance = get_distance(donor_agent.startx, donor_agent.starty, volunteer_agent.startx, volunteer_agent.starty, off_routing_limit)
+			
+			if distance <= off_routing_limit:
+			
+				pairs.append((100 * distance/lengths[volunteer] if lengths[volunteer] > 0 else 0,
+							max(volunteer_agent.endt - donor_agent.startt, donor_agent.endt - volunteer_agent.startt), distance, volunteer))
+		
+		pairs.sort()
+	
+	update_sensitivity_index(index)
+
+
+#	Move sensitivity index cursors to the current off-routing threshold	#
+def update_sensitivity_index(index):
+
+	for donor, pairs in index['volunteers'].items():
+	
+		cursor = index['cursors'][donor]
+		
+		#	A wider threshold only adds the newly eligible pairs	#
+		while cursor < len(pairs) and pairs[cursor][0] <= Tl * (1 + 1e-9):
+		
+			cursor = cursor + 1
+		
+		while cursor > 0 and pairs[cursor - 1][0] > Tl * (1 + 1e-9):
+		
+			cursor = cursor - 1
+		
+		index['cursors'][donor] = cursor
+
+
+#	Get eligible volunteers of a donor from the sensitivity index	#
+def get_indexed_volunteers(donor_agent, available, sensitivity):
+
+	agents, lengths = sensitivity['agents'], sensitivity['lengths']
+	pairs = sensitivity['volunteers'][donor_agent.agentid][:sensitivity['cursors'][donor_agent.agentid]]
+	v_prime = [volunteer for required, overlap, distance, volunteer in pairs
+				if volunteer in available and overlap >= To and distance <= (Tl/100) * lengths[volunteer]
+				and agents[volunteer].amount >= (1 + Ta/100) * donor_agent.amount]
+	
+	return sorted(v_prime, key = sensitivity['order'].get)
+
+
+#	Get eligible donors of each receiver from the sensitivity index	#
+def get_indexed_receivers(D, R, sensitivity):
+
+	agents = sensitivity['agents']
+	indexed = {receiver: [] for receiver in R}
+	
+	for donor in D:
+	
+		distances, receivers = sensitivity['receivers'][donor]
+		
+		for receiver in receivers[:bisect.bisect_right(distances, agents[donor].vicinity)]:
+		
+			if receiver in indexed:
+			
+				indexed[receiver].append(donor)
+	
+	return indexed
+
+
+#	Sweep thresholds and record allocation response curves	#
+def run_sensitivity(C, PFD, PFR, NPFD, NPFR, V, sweeps):
+
+	store, settings = DATA_STORE_LOCATION, {'CHECKPOINT': CHECKPOINT, 'RESUME': RESUME}
+	index = {'P': build_sensitivity_index(C, PFD, PFR, V, sweeps), '': build_sensitivity_index(C, NPFD, NPFR, V, sweeps)}
+	
+	#	Sweep runs are not checkpointed	#
+	globals().update({'CHECKPOINT': 'OFF', 'RESUME': 'OFF'})
+	
+	try:
+	
+		print_locked("\nSENSITIVITY:\t\t\t", ", ".join([name + " " + str(len(values)) + " values" for name, values in sweeps.items()]))
+		
+		for name, values in sweeps.items():
+		
+			default, curve = globals()[name], []
+			
+			try:
+			
+				for value in sorted(values):
+				
+					globals()[name] = value
+					[update_sensitivity_index(food_index) for food_index in index.values()]
+					
+					#	Match a copy of the agents	#
+					run_C, run_PFD, run_PFR, run_NPFD, run_NPFR, run_V = copy.deepcopy((C, PFD, PFR, NPFD, NPFR, V))
+					indexes = dict(build_indexes(run_C, run_V), sensitivity = index)
+					Mp, run_PFD, run_PFR, run_V = match_requests(run_C, run_PFD, run_PFR, run_V, Food = 'P', indexes = indexes)
+					Mp = [the_tuple for the_tuple in Mp if (the_tuple[-1] in run_PFR)]
+					Mnp, run_NPFD, run_NPFR, run_V = match_requests(run_C, run_NPFD, run_NPFR, run_V, Food = '', indexes = indexes)
+					Mnp = [the_tuple for the_tuple in Mnp if (the_tuple[-1] in run_NPFR)]
+					
+					curve.append([value, round(100 * (len(Mp) + len(Mnp))/max(len(PFD) + len(NPFD), 1), 2),
+									round(100 * len(Mp)/max(len(PFD), 1), 2), round(100 * len(Mnp)/max(len(NPFD), 1), 2)])
+					
+					#	Maximum allocation at this value	#
+					if len(MATCH_BOUNDS) == 2:
+					
+						curve[-1].append(round(100 * (MATCH_BOUNDS['P'] + MATCH_BOUNDS[''])/max(len(PFD) + len(NPFD), 1), 2))
+					
+					print_locked(name + " = " + str(value) + ":\t\t\t", curve[-1][1], "% allocated (", curve[-1][2], "% perishable,", curve[-1][3], "% non-perishable )",
+								*(["maximum:", curve[-1][4], "%"] if len(curve[-1]) > 4 else []))
+					add_metric('runs_completed_total')
+			
+			finally:
+			
+				globals()[name] = default
+				[update_sensitivity_index(food_index) for food_index in index.values()]
+			
+			#   Write the response curve   #
+			with open(store + "_sensitivity_" + name + ".txt", "w") as fp:
+			
+				[fp.write("\t".join([str(value) for value in row]) + "\n") for row in curve]
+	
+	finally:
+	
+		globals().update(settings)
+
+
+#	Sweep nested volunteer availability levels and record the allocation curve	#
+def run_availability(C, PFD, PFR, NPFD, NPFR, order, levels, record = None, save = True):
+
+	store, settings = DATA_STORE_LOCATION, {'CHECKPOINT': CHECKPOINT, 'RESUME': RESUME}
+	agents = {agent.agentid: agent for agent in C}
+	index = {'P': build_sensitivity_index(C, PFD, PFR, [], {}, order), '': build_sensitivity_index(C, NPFD, NPFR, [], {}, order)}
+	added, curve = 0, []
+
+	#	Sweep runs are not checkpointed	#
+	globals().update({'CHECKPOINT': 'OFF', 'RESUME': 'OFF'})
+
+	try:
+
+		print_locked("\nAVAILABILITY SWEEP:\t\t", ", ".join(sorted(levels, key = get_v_settings)))
+
+		for level in sorted(levels, key = get_v_settings):
+
+			level_start = time.perf_counter()
+			count = int(len(order) * round(get_v_settings(level)/get_v_settings('32X'), 5))
+
+			#	Each level extends the last, only its new volunteers join the index	#
+			add_sensitivity_volunteers(index['P'], agents, PFD, order[added:count])
+			add_sensitivity_volunteers(index[''], agents, NPFD, order[added:count])
+			added = max(added, count)
+
+			#	Match a copy of the agents with the volunteer prefix	#
+			run_C, run_PFD, run_PFR, run_NPFD, run_NPFR = copy.deepcopy((C, PFD, PFR, NPFD, NPFR))
+			run_V = order[:count]
+			indexes = dict(build_indexes(run_C, run_V), sensitivity = index)
+			Mp, run_PFD, run_PFR, run_V = match_requests(run_C, run_PFD, run_PFR, run_V, Food = 'P', indexes = indexes)
+			Mp = [the_tuple for the_tuple in Mp if (the_tuple[-1] in run_PFR)]
+			Mnp, run_NPFD, run_NPFR, run_V = match_requests(run_C, run_NPFD, run_NPFR, run_V, Food = '', indexes = indexes)
+			Mnp = [the_tuple for the_tuple in Mnp if (the_tuple[-1] in run_NPFR)]
+			maximum = 100 * (MATCH_BOUNDS['P'] + MATCH_BOUNDS[''])/max(len(PFD) + len(NPFD), 1) if len(MATCH_BOUNDS) == 2 else None
+
+			curve.append([round(get_v_settings(level)/2), round(100 * (len(Mp) + len(Mnp))/max(len(PFD) + len(NPFD), 1), 2),
+							round(100 * len(Mp)/max(len(PFD), 1), 2), round(100 * len(Mnp)/max(len(NPFD), 1), 2)] + ([round(maximum, 2)] if maximum is not None else []))
+			print_locked(level + ":\t\t\t\t", curve[-1][1], "% allocated (", curve[-1][2], "% perishable,", curve[-1][3], "% non-perishable )",
+						count, "volunteers", *(["maximum:", curve[-1][4], "%"] if maximum is not None else []))
+			add_metric('runs_completed_total')
+
+			#	Store level results	#
+			if record is not None:
+
+				store_run_result(dict(record, timestamp = str(datetime.datetime.now()), volunteers = level, volunteer_factor = curve[-1][0],
+									settings = json.dumps(dict(get_settings(), VOLUNTEERS = level)), volunteer_count = count,
+									perishable_matched = len(Mp), non_perishable_matched = len(Mnp), allocation = 100 * (len(Mp) + len(Mnp))/max(len(PFD) + len(NPFD), 1),
+									perishable_allocation = 100 * len(Mp)/max(len(PFD), 1), non_perishable_allocation = 100 * len(Mnp)/max(len(NPFD), 1),
+									manipulated = None, gained = None, lost = None, same = None, uncomparable = None,
+									seconds = time.perf_counter() - level_start, maximum_allocation = maximum))
+
+	finally:
+
+		globals().update(settings)
+
+	#   Write the availability curve   #
+	if save:
+
+		with open(store + "_availability.txt", "w") as fp:
+
+			[fp.write("\t".join([str(value) for value in row]) + "\n") for row in curve]
+
+
+#	Donor's rank of a receiver	#
+def get_donor_rank(donor_rank, receiver_agent, receiver_sort_settings):
+
+	try:
+
+		return (0, donor_rank[receiver_agent.agentid], 0)
+
+	except KeyError:
+
+		if receiver_sort_settings == 'START':
+
+			return (1, receiver_agent.startt, receiver_agent.agentid)
+
+		else:
+
+			return (1, receiver_agent.endt, receiver_agent.agentid)
+
+
+#	Match donor and receivers with deferred acceptance	#
+def match_deferred_acceptance(C, D, R, M, proposer):
+
+	receiver_sort_settings = SORTING
+	agents = {agent.agentid: agent for agent in C}
+	donor_set = set(D)
+
+	#	Receiver proposal lists and rank tables	#
+	receiver_lists, receiver_ranks = {}, {}
+
+	for receiver in R:
+
+		receiver_lists[receiver] = list(dict.fromkeys(agent for agent in agents[receiver].m_pref if agent in donor_set))
+		receiver_ranks[receiver] = {donor: i for i, donor in enumerate(receiver_lists[receiver])}
+
+	#	Donor rank tables (unlisted receivers follow in sort order)	#
+	donor_ranks = {donor: {agent: i for i, agent in reversed(list(enumerate(agents[donor].m_pref)))} for donor in D}
+	held = {}
+
+	if proposer == 'RECEIVER':
+
+		#	Receivers propose, donors hold the best proposal so far	#
+		next_choice = {receiver: 0 for receiver in R}
+		free = list(reversed(R))
+
+		while len(free) > 0:
+
+			receiver = free.pop()
+			receiver_list = receiver_lists[receiver]
+
+			while next_choice[receiver] < len(receiver_list):
+
+				donor = receiver_list[next_choice[receiver]]
+				next_choice[receiver] = next_choice[receiver] + 1
+				current = held.get(donor)
+
+				if current is None:
+
+					held[donor] = receiver
+					break
+
+				if (get_donor_rank(donor_ranks[donor], agents[receiver], receiver_sort_settings)
+					< get_donor_rank(donor_ranks[donor], agents[current], receiver_sort_settings)):
+
+					held[donor] = receiver
+					free.append(current)
+					break
+
+	else:
+
+		#	Donors propose to receivers that listed them, receivers hold the best proposal so far	#
+		donor_lists = {donor: [] for donor in D}
+
+		for receiver in R:
+
+			for donor in receiver_lists[receiver]:
+
+				donor_lists[donor].append(receiver)
+
+		for donor in D:
+
+			donor_lists[donor].sort(key=lambda x: get_donor_rank(donor_ranks[donor], agents[x], receiver_sort_settings))
+
+		next_choice = {donor: 0 for donor in D}
+		accepted = {}
+		free = list(reversed(D))
+
+		while len(free) > 0:
+
+			donor = free.pop()
+			donor_list = donor_lists[donor]
+
+			while next_choice[donor] < len(donor_list):
+
+				receiver = donor_list[next_choice[donor]]
+				next_choice[donor] = next_choice[donor] + 1
+				current = accepted.get(receiver)
+
+				if current is None:
+
+					accepted[receiver] = donor
+					break
+
+				if receiver_ranks[receiver][donor] < receiver_ranks[receiver][current]:
+
+					accepted[receiver] = donor
+					free.append(current)
+					break
+
+		held = {donor: receiver for receiver, donor in accepted.items()}
+
+	#	Record matches in receiver order	#
+	match_index = {match[0]: i for i, match in enumerate(M)}
+
+	for receiver in R:
+
+		for donor in receiver_lists[receiver]:
+
+			if held.get(donor) == receiver:
+
+				if donor in match_index:
+
+					M[match_index[donor]] = (donor, M[match_index[donor]][1], receiver)
+
+				else:
+
+					M.append((donor, receiver))
+
+				donor_set.remove(donor)
+				break
+
+	D[:] = [donor for donor in D if donor in donor_set]
+
+	return M, D
+
+
+#	Get receiver-donor eligibility as sparse adjacency arrays	#
+def get_eligibility_arrays(agents, D, R):
+
+	columns = {donor: i for i, donor in enumerate(D)}
+	indptr, indices = [0], []
+
+	for receiver in R:
+
+		indices.extend([columns[agent] for agent in dict.fromkeys(agents[receiver].m_pref) if agent in columns])
+		indptr.append(len(indices))
+
+	return indptr, indices
+
+
+#	Get a maximum-cardinality matching of rows to columns with Hopcroft-Karp	#
+def get_maximum_matching(indptr, indices, columns):
+
+	rows = len(indptr) - 1
+	match_row, match_column = [-1] * rows, [-1] * columns
+
+	#	Start from a greedy matching in row order	#
+	for row in range(rows):
+
+		for position in range(indptr[row], indptr[row + 1]):
+
+			if match_column[indices[position]] < 0:
+
+				match_row[row], match_column[indices[position]] = indices[position], row
+				break
+
+	while True:
+
+		#	Layer rows by shortest alternating path from a free row	#
+		free = [row for row in range(rows) if match_row[row] < 0]
+		layer = [-1] * rows
+		shortest = math.inf
+
+		for row in free:
+
+			layer[row] = 0
+
+		frontier = list(free)
+
+		for row in frontier:
+
+			if layer[row] >= shortest:
+
+				continue
+
+			for position in range(indptr[row], indptr[row + 1]):
+
+				partner = match_column[indices[position]]
+
+				if partner < 0:
+
+					shortest = min(shortest, layer[row] + 1)
+
+				elif layer[partner] < 0:
+
+					layer[partner] = layer[row] + 1
+					frontier.append(partner)
+
+		if shortest == math.inf:
+
+			return match_row
+
+		#	Augment along vertex-disjoint shortest paths, each arc tried once per phase	#
+		pointer = indptr[:-1]
+
+		for root in free:
+
+			stack = [root]
+
+			while len(stack) > 0:
+
+				row = stack[-1]
+
+				if pointer[row] == indptr[row + 1]:
+
+					layer[row] = -1
+					stack.pop()
+					continue
+
+				column = indices[pointer[row]]
+				pointer[row] = pointer[row] + 1
+				partner = match_column[column]
+
+				if partner < 0 and layer[row] + 1 == shortest:
+
+					for path_row in stack:
+
+						path_column = indices[pointer[path_row] - 1]
+						match_row[path_row], match_column[path_column] = path_column, path_row
+
+					break
+
+				if partner >= 0 and layer[partner] == layer[row] + 1 < shortest:
+
+					stack.append(partner)
+
+
+#	Match donor and receivers for the largest number of matches	#
+def match_maximum(C, D, R, M):
+
+	agents = {agent.agentid: agent for agent in C}
+	indptr, indices = get_eligibility_arrays(agents, D, R)
+	match_row = get_maximum_matching(indptr, indices, len(D))
+
+	#	Record matches in receiver order	#
+	match_index = {match[0]: i for i, match in enumerate(M)}
+	matched = set()
+
+	for receiver, column in zip(R, match_row):
+
+		if column >= 0:
+
+			donor = D[column]
+
+			if donor in match_index:
+
+				M[match_index[donor]] = (donor, M[match_index[donor]][1], receiver)
+
+			else:
+
+				M.append((donor, receiver))
+
+			matched.add(donor)
+
+	D[:] = [donor for donor in D if donor not in matched]
+
+	return M, D
+
+
+#	Get the maximum-cardinality allocation of a pass before matching	#
+def get_matching_bound(agents, D, R):
+
+	indptr, indices = get_eligibility_arrays(agents, D, R)
+
+	return sum([1 for column in get_maximum_matching(indptr, indices, len(D)) if column >= 0])
+
+
+#	Get checkpoint section of a matching pass	#
+def get_matching_section(Food, R):
+
+	return "matching_" + hashlib.sha1((str(Food) + str(sorted(R))).encode()).hexdigest()[:16]
+
+
+#	Save matching state	#
+def save_matching_checkpoint(agents, Food, M, D, R, V, capacity, cursor, complete = False):
+
+	volunteers = [agent for agent in agents.values() if agent.agenttype == 'V']
+
+	save_checkpoint(get_matching_section(Food, R), {'cursor': cursor, 'complete': complete,
+					'M': M, 'D': D, 'R': R, 'V': V, 'capacity': capacity,
+					'amounts': {agent.agentid: agent.amount for agent in volunteers},
+					'routes': {agent.agentid: agent.route for agent in volunteers if len(agent.route) > 0},
+					'vicinities': {agent.agentid: agent.vicinity for agent in agents.values() if agent.agenttype == 'D'},
+					'm_prefs': {receiver: agents[receiver].m_pref for receiver in R}})
+
+
+#	Restore matching state	#
+def restore_matching_checkpoint(agents, Food, D, R, V):
+
+	snapshot = load_checkpoint(get_matching_section(Food, R))
+
+	if snapshot is None:
+
+		return None
+
+	D[:], R[:], V[:] = snapshot['D'], snapshot['R'], snapshot['V']
+
+	for agent in agents.values():
+
+		if agent.agenttype == 'V':
+
+			agent.amount = snapshot['amounts'].get(agent.agentid, agent.amount)
+			agent.route = snapshot['routes'].get(agent.agentid, [])
+
+		elif agent.agenttype == 'D':
+
+			agent.vicinity = snapshot['vicinities'].get(agent.agentid, agent.vicinity)
+
+	for receiver, m_pref in snapshot['m_prefs'].items():
+
+		agents[receiver].m_pref = m_pref
+
+	return snapshot['M'], snapshot['cursor'], snapshot['capacity'], snapshot['complete']
+
+
+#	Check a volunteer can reach a donor, capacity aside	#
+def volunteer_reaches(donor_agent, volunteer_agent):
+
+	off_routing_limit = (Tl/100) * math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2)
+	
+	return ((get_distance(donor_agent.startx, donor_agent.starty, volunteer_agent.startx, volunteer_agent.starty, off_routing_limit) <= off_routing_limit)
+			and (donor_agent.startt < volunteer_agent.endt and volunteer_agent.startt < donor_agent.endt and (volunteer_agent.endt - donor_agent.startt >= To or donor_agent.endt - volunteer_agent.startt >= To))
+			and (donor_agent.agentid in volunteer_agent.m_pref or len(volunteer_agent.m_pref) == 0))
+
+
+#	Get how far a volunteer carries the food of a donor	#
+def get_volunteer_vicinity(volunteer_agent, Food):
+
+	if Food != 'P' or volunteer_agent.transac == 'AC':
+
+		return int(math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2))
+
+	if volunteer_agent.transtype == 'MOTORED':
+
+		return Tpm
+
+	return Tpnm
+
+
+#	Use up volunteer payload of a single trip, False once the volunteer is out of capacity	#
+def charge_volunteer(volunteer_agent):
+
+	if volunteer_agent.amount < 2 * Tm:
+
+		return False
+
+	volunteer_agent.amount = volunteer_agent.amount - Tm
+
+	return True
+
+
+#	Assign volunteers to donors	#
+def assign_volunteers(C, D, V, M, Food, sensitivity = None, reachable = None):
+
+	available = set(V)
+	
+	#	Match volunteers	#
+	for donor in D:
+	
+		donor_agent = get_agent(C, donor)
+		v_prime = []
+		
+		#	Volunteers from the sensitivity index	#
+		if sensitivity is not None:
+		
+			v_prime = get_indexed_volunteers(donor_agent, available, sensitivity)
+		
+		#	Volunteers found in reach still available with enough capacity	#
+		elif reachable is not None:
+		
+			v_prime = [volunteer for volunteer in reachable['volunteers'][donor]
+						if volunteer in available and reachable['agents'][volunteer].amount >= (1 + Ta/100) * donor_agent.amount]
+		
+		for volunteer in (V if sensitivity is None and reachable is None else []):
+		
+			volunteer_agent = get_agent(C, volunteer)
+			
+			if (volunteer_agent.amount >= (1 + Ta/100) * donor_agent.amount) and volunteer_reaches(donor_agent, volunteer_agent):
+			
+				v_prime.append(volunteer)
+		
+		if len(v_prime) == 0:
+		
+			if Food == 'P':
+			
+				vicinity = Tpnm
+			
+			else:
+			
+				vicinity = Tnp
+		
+		else:
+		
+			for volunteer in v_prime:
+			
+				volunteer_agent = get_agent(C, volunteer)
+				vicinity = get_volunteer_vicinity(volunteer_agent, Food)
+				
+				if vicinity > donor_agent.vicinity:
+				
+					donor_agent.vicinity = vicinity
+					match_index = [i for i, match in enumerate(M) if match[0] == donor_agent.agentid]
+					
+					if len(match_index) > 0:
+					
+						M[match_index[0]] = (donor_agent.agentid, volunteer_agent.agentid)
+					
+					else:
+					
+						M.append((donor_agent.agentid, volunteer_agent.agentid))
+	
+		try:
+		
+			match_index = [i for i, match in enumerate(M) if match[0] == donor_agent.agentid]
+			matched_volunteer_agent = get_agent(C, M[match_index[0]][1])
 			
-			C.append(Agent(part_1[0], part_1[1], part_1[2], part_1[3], part_1[4], part_1[5], part_1[6], part_1[7], 
-							pref, 
-							part_2[1], part_2[2], part_2[3]))
+			if not charge_volunteer(matched_volunteer_agent):
+			
+				V.remove(M[match_index[0]][1])
+				available.discard(M[match_index[0]][1])
+		
+		except Exception:
+		
+			pass
+
+
+#	Get eligibility rows per tile within the memory budget	#
+def get_tile_rows(columns):
+
+	budget = MEMORY_BUDGET_MB * 1024 ** 2
+
+	#	A few float temporaries per pair, in a quarter of the budget	#
+	return max(1, int(budget/4/(32 * max(columns, 1))))
+
+
+#	Pack boolean rows into uint64 words	#
+def pack_bits(rows):
+
+	padded = np.zeros((rows.shape[0], -(-rows.shape[1] // 64) * 64), dtype = bool)
+	padded[:, :rows.shape[1]] = rows
+
+	return np.packbits(padded, axis = 1, bitorder = 'little').view('<u8')
+
+
+#	Unpack a uint64 row into booleans	#
+def unpack_bits(row, columns):
+
+	return np.unpackbits(row.view(np.uint8), bitorder = 'little')[:columns].astype(bool)
+
+
+#	Get positions of agents in a list, -1 elsewhere	#
+def get_positions(agents, size):
+
+	positions = np.full(size, -1, dtype = np.int64)
+	positions[np.asarray(agents, dtype = np.int64)] = np.arange(len(agents))
+
+	return positions
+
+
+#	Filter a preference list by a packed eligibility row	#
+def filter_bit_preferences(row, pref, positions, ordered, order):
+
+	try:
+
+		pref = np.asarray(pref, dtype = np.int64)
+
+	#	Empty preference lists are read as ['']	#
+	except ValueError:
+
+		pref = np.asarray([agent for agent in pref if agent != ''], dtype = np.int64)
+
+	found = positions[np.clip(pref, 0, len(positions) - 1)]
+	found[(pref < 0) | (pref >= len(positions))] = -1
+	eligible = unpack_bits(row, len(order))
+	preferred = np.zeros(len(pref), dtype = bool)
+	preferred[found >= 0] = eligible[found[found >= 0]]
+	eligible[found[found >= 0]] = False
+
+	#	Preferred eligible agents, then the other eligible agents in sorting order	#
+	return pref[preferred].tolist(), ordered[eligible[order]].tolist()
+
+
+#	Update receiver and donor preferences over packed bitsets	#
+def update_bit_preferences(C, D, R, M):
+
+	preference_settings, receiver_sort_settings, distance_settings = PREFERENCE, SORTING, DISTANCE
+	agents = {agent.agentid: agent for agent in C}
+	size = max(agents, default = -1) + 1
+	donors, receivers = [agents[donor] for donor in D], [agents[receiver] for receiver in R]
+	d_x, d_y = np.array([agent.startx for agent in donors], dtype = float), np.array([agent.starty for agent in donors], dtype = float)
+	d_end, vicinity = np.array([agent.endt for agent in donors], dtype = float), np.array([agent.vicinity for agent in donors], dtype = float)
+	r_x, r_y = np.array([agent.startx for agent in receivers], dtype = float), np.array([agent.starty for agent in receivers], dtype = float)
+	r_time = np.array([agent.startt if receiver_sort_settings == 'START' else agent.endt for agent in receivers], dtype = float)
+
+	#	Receiver rows of donor eligibility, built in tiles	#
+	bits = np.zeros((len(R), -(-len(D) // 64)), dtype = '<u8')
+	tile = get_tile_rows(len(D))
+
+	for start in range(0, len(R), tile):
+
+		stop = min(start + tile, len(R))
+
+		if distance_settings != 'ROAD':
+
+			distance = np.sqrt((d_x[None, :] - r_x[start:stop, None]) ** 2 + (d_y[None, :] - r_y[start:stop, None]) ** 2)
+
+		else:
+
+			distance = np.array([[get_distance(donor.startx, donor.starty, receiver.startx, receiver.starty, donor.vicinity) for donor in donors]
+									for receiver in receivers[start:stop]]).reshape(stop - start, len(D))
+
+		bits[start:stop] = pack_bits((distance <= vicinity[None, :]) & (d_end[None, :] < r_time[start:stop, None]))
+
+	#	Update receiver preferences	#
+	positions = get_positions(D, size)
+	order = np.lexsort((np.asarray(D), np.array([agent.startt for agent in donors], dtype = float)))
+	ordered = np.asarray(D, dtype = np.int64)[order]
+
+	for row, receiver_agent in zip(bits, receivers):
+
+		preferred, eligible_not_preferred = filter_bit_preferences(row, receiver_agent.m_pref, positions, ordered, order)
+
+		if preference_settings == 'ORIGINAL':
+
+			receiver_agent.m_pref = preferred
+
+		elif preference_settings in ['ELIGIBLE', 'UPDATED']:
+
+			receiver_agent.m_pref = preferred + eligible_not_preferred
+
+	#	Update donor preferences, each donor's neighbourhood replaces the previous one on the last receiver	#
+	if len(D) == 0 or len(R) == 0:
+
+		return
+
+	donor_agent, receiver_agent = donors[-1], receivers[-1]
+	volunteer = [the_tuple[1] for the_tuple in M if (the_tuple[0] == donor_agent.agentid)]
+
+	if distance_settings != 'ROAD':
+
+		distance = np.sqrt((donor_agent.startx - r_x) ** 2 + (donor_agent.starty - r_y) ** 2)
+
+	else:
+
+		distance = np.array([get_distance(donor_agent.startx, donor_agent.starty, receiver.startx, receiver.starty, donor_agent.vicinity) for receiver in receivers])
+
+	if len(volunteer) != 0:
+
+		volunteer_agent = agents[volunteer[0]]
+		v_s_to_e_distance = math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2)
+		r_end_x, r_end_y = np.array([agent.endx for agent in receivers], dtype = float), np.array([agent.endy for agent in receivers], dtype = float)
+		twice_triangle_area = np.abs((volunteer_agent.startx - volunteer_agent.endx) * (volunteer_agent.endy - r_end_y) - (volunteer_agent.starty - volunteer_agent.endy) * (volunteer_agent.endx - r_end_x))
+		off_routing_distance = twice_triangle_area/v_s_to_e_distance
+
+	else:
+
+		v_s_to_e_distance, off_routing_distance = 0, np.full(len(R), -1.0)
+
+	neighbourhood = (distance <= donor_agent.vicinity) & (off_routing_distance <= (Tl/100) * v_s_to_e_distance) & (donor_agent.endt < r_time)
+	order = np.lexsort((np.asarray(R), r_time))
+	preferred, neighbour_not_preferred = filter_bit_preferences(pack_bits(neighbourhood[None, :])[0], donor_agent.m_pref,
+																get_positions(R, size), np.asarray(R, dtype = np.int64)[order], order)
+
+	if preference_settings == 'ORIGINAL':
+
+		receiver_agent.m_pref = preferred
+
+	elif preference_settings in ['ELIGIBLE', 'UPDATED']:
+
+		receiver_agent.m_pref = preferred + neighbour_not_preferred
+
+
+#	Update receiver and donor preferences	#
+def update_preferences(C, D, R, M, sensitivity = None):
+
+	#	Match receivers	#
+	#	Update receiver preferences#
+	preference_settings = PREFERENCE
+	receiver_sort_settings = SORTING
+	indexed = get_indexed_receivers(D, R, sensitivity) if sensitivity is not None else None
+	bitsets = ELIGIBILITY == 'BITSET' and sensitivity is None
+	
+	if bitsets:
+	
+		update_bit_preferences(C, D, R, M)
+	
+	for receiver in (R if not bitsets else []):
+	
+		receiver_agent = get_agent(C, receiver)		
+		original_pref = receiver_agent.m_pref
+		eligibility = indexed[receiver] if indexed is not None else []
+		
+		for donor in (D if indexed is None else []):
+		
+			donor_agent = get_agent(C, donor)
+			d_to_r_distance = get_distance(donor_agent.startx, donor_agent.starty, receiver_agent.startx, receiver_agent.starty, donor_agent.vicinity)
 			
-			if part_1[1] == 'V':
+			if d_to_r_distance <= donor_agent.vicinity:
 			
-				V.append(part_1[0])
+				if ((receiver_sort_settings == 'START' and donor_agent.endt < receiver_agent.startt)
+					or (receiver_sort_settings == 'END' and donor_agent.endt < receiver_agent.endt)):
 			
-			elif part_1[1] == 'D':
+					eligibility.append(donor_agent.agentid)
+		
+		eligible_not_preferred = [agent for agent in eligibility if agent not in original_pref]
+		eligible_not_preferred.sort(key=lambda x: (get_agent(C, x).startt, x))
+		
+		if preference_settings == 'ORIGINAL':
+		
+			receiver_agent.m_pref = [agent for agent in original_pref if agent in eligibility]
+		
+		elif preference_settings in ['ELIGIBLE', 'UPDATED']:
+		
+			receiver_agent.m_pref = [agent for agent in original_pref if agent in eligibility] + eligible_not_preferred
+		
+	#	Update donor preferences#
+	#	Each donor's neighbourhood replaces the previous one, so indexed runs only need the last	#
+	for donor in ([] if bitsets else D if sensitivity is None else D[-1:]):
+	
+		donor_agent = get_agent(C, donor)
+		original_pref = donor_agent.m_pref
+		volunteer = [the_tuple[1] for the_tuple in M if (the_tuple[0] == donor)]
+		
+		if len(volunteer) != 0:
+		
+			volunteer_agent = get_agent(C, volunteer[0])
+			v_s_to_e_distance = math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2)
+		
+		else:
+		
+			v_s_to_e_distance = 0
+		
+		neighbourhood = []
+		
+		for receiver in R:
+		
+			receiver_agent = get_agent(C, receiver)
+			d_to_r_distance = get_distance(donor_agent.startx, donor_agent.starty, receiver_agent.startx, receiver_agent.starty, donor_agent.vicinity)
 			
-				if part_1[2] == 'P':
+			if len(volunteer) != 0:
 			
-					PFD.append(part_1[0])
-				
-				else:
-				
-					NPFD.append(part_1[0])
+				twice_triangle_area = abs((volunteer_agent.startx - volunteer_agent.endx) * (volunteer_agent.endy - receiver_agent.endy) - (volunteer_agent.starty - volunteer_agent.endy) * (volunteer_agent.endx - receiver_agent.endx))
+				off_routing_distance = twice_triangle_area/v_s_to_e_distance
 			
 			else:
 			
-				if part_1[2] == 'P':
+				off_routing_distance = -1
 			
-					PFR.append(part_1[0])
+			if (d_to_r_distance <= donor_agent.vicinity and (off_routing_distance <= (Tl/100) * v_s_to_e_distance)):
 				
-				else:
+				if ((receiver_sort_settings == 'START' and donor_agent.endt < receiver_agent.startt)
+					or (receiver_sort_settings == 'END' and donor_agent.endt < receiver_agent.endt)):
 				
-					NPFR.append(part_1[0])
-	
-	return C, PFD, PFR, NPFD, NPFR, V
-
-
-#   Convert read values to int, str or list    #
-def convert(some_value):
-
-	try:
-    
-		return int(some_value)
-        
-	except ValueError:
-	
-		if ',' not in some_value:
-    	
-			return some_value[1:-1]
+					neighbourhood.append(receiver_agent.agentid)
+		
+		neighbour_not_preferred = [agent for agent in neighbourhood if agent not in original_pref]
+		
+		if receiver_sort_settings == 'START':
+		
+			neighbour_not_preferred.sort(key=lambda x: (get_agent(C, x).startt, x))
 		
 		else:
-    	
-			return [int(element) for element in re.split("\[|, |\]", some_value)]
-
-
-#	Get volunteer availability settings	#
-def get_v_settings(setting):
-
-	if setting == '1X':
-	
-		return 2
-	
-	elif setting == '2X':
-	
-		return 4
-	
-	elif setting == '4X':
-	
-		return 8
-	
-	elif setting == '8X':
+		
+			neighbour_not_preferred.sort(key=lambda x: (get_agent(C, x).endt, x))
+		
+		if preference_settings == 'ORIGINAL':
+		
+			receiver_agent.m_pref = [agent for agent in original_pref if agent in neighbourhood]
+		
+		elif preference_settings in ['ELIGIBLE', 'UPDATED']:
+		
+			receiver_agent.m_pref = [agent for agent in original_pref if agent in neighbourhood] + neighbour_not_preferred
 	
-		return 16
 	
-	elif setting == '16X':
+	#	Receiver sorting #
+	if receiver_sort_settings == 'START':
 	
-		return 32
+		R.sort(key=lambda x: (get_agent(C, x).startt, x))
 	
-	elif setting == '32X':
+	else:
 	
-		return 64
+		R.sort(key=lambda x: (get_agent(C, x).endt, x))
 
 
-#	Get agent with matching agentid	#
-def get_agent(C, request_id):
+#	Match donor and receivers greedily	#
+def match_greedy(C, D, R, M, cursor = 0, checkpoint = None):
 
-	corresponding_agent = [agent for agent in C if agent.agentid == request_id]
+	for position in range(cursor, len(R)):
 	
-	return corresponding_agent[0]
+		receiver = R[position]
+		receiver_agent = get_agent(C, receiver)
+		receiver_pref = [agent for agent in receiver_agent.m_pref if agent in D]
+		match_donor_position = -1
+		best_preference = -1
+		
+		for i, donor in enumerate(receiver_pref):
+		
+			donor_agent = get_agent(C, donor)
+			
+			try:
+			
+				current_position = donor_agent.m_pref.index(receiver)
+				
+				if (current_position < best_preference or match_donor_position < 0):
+				
+					match_donor_position = i
+					best_preference = current_position
+			
+			except Exception:
+			
+				pass
+		
+		try:
+		
+			match_index = [i for i, match in enumerate(M) if match[0] == receiver_pref[match_donor_position]]
+			match_tuples = [match for i, match in enumerate(M) if match[0] == receiver_pref[match_donor_position]]
+			M[match_index[0]] = (receiver_pref[match_donor_position], M[match_index[0]][1], receiver_agent.agentid)
+			D.remove(M[match_index[0]][0])
+		
+		except Exception:
+		
+			try:
+			
+				M.append((receiver_pref[match_donor_position], receiver_agent.agentid))
+				D.remove(M[match_index[0]][0])
+			
+			except Exception:
+			
+				pass
+		
+		add_metric('receivers_processed_total')
+		set_metric('pass_receivers_done', position + 1)
+		
+		#	Periodic checkpoint	#
+		if checkpoint is not None and (position + 1) % CHECKPOINT_INTERVAL == 0:
+		
+			checkpoint(position + 1)
 
 
 #	Assign volunteer, update preference and match requests	#
-def match_requests(C, D, R, V, Food):
+def match_requests(C, D, R, V, Food, indexes = None, reach = None):
 
 	M = []
+	routing_settings, matching_settings, checkpoint_settings, bound_settings = ROUTING, MATCHING, CHECKPOINT, BOUND
+	agents = indexes['agents'] if indexes is not None else {agent.agentid: agent for agent in C}
+	sensitivity = dict(indexes['sensitivity'][Food], agents = agents) if indexes is not None and 'sensitivity' in indexes else None
+	reachable = {'volunteers': reach, 'agents': agents} if reach is not None else None
+	snapshot = restore_matching_checkpoint(agents, Food, D, R, V) if RESUME == 'ON' else None
+	MATCH_BOUNDS.pop(Food, None)
 	
-	#	Match volunteers	#
-	for donor in D:
+	if snapshot is not None:
 	
-		donor_agent = get_agent(C, donor)
-		v_prime = []
+		#	Resume from checkpoint	#
+		M, cursor, capacity, complete = snapshot
+	
+	else:
+	
+		cursor, capacity, complete = 0, None, False
 		
-		for volunteer in V:
+		#	Keep volunteer capacities for routing	#
+		if routing_settings == 'CAPACITATED':
 		
-			volunteer_agent = get_agent(C, volunteer)
-			
-			if ((volunteer_agent.amount >= (1 + Ta/100) * donor_agent.amount)
-				and (math.sqrt((donor_agent.startx - volunteer_agent.startx) ** 2 + (donor_agent.starty - volunteer_agent.starty) ** 2) <= (Tl/100) * math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2))
-				and (donor_agent.startt < volunteer_agent.endt and volunteer_agent.startt < donor_agent.endt and (volunteer_agent.endt - donor_agent.startt >= To or donor_agent.endt - volunteer_agent.startt >= To))
-				and (donor_agent.agentid in volunteer_agent.m_pref or len(volunteer_agent.m_pref) == 0)):
-			
-				v_prime.append(volunteer)
+			capacity = (list(V), {volunteer: agents[volunteer].amount for volunteer in V})
 		
-		if len(v_prime) == 0:
+		#	Match volunteers and update preferences	#
+		record_phase(Food, "volunteers", donors = len(D), volunteers = len(V))
+		assign_volunteers(C, D, V, M, Food, sensitivity, reachable)
+		record_phase(Food, "preferences", receivers = len(R))
+		update_preferences(C, D, R, M, sensitivity)
 		
-			if Food == 'P':
+		#	Largest allocation the eligibility left by volunteers allows	#
+		if bound_settings == 'ON':
+		
+			MATCH_BOUNDS[Food] = get_matching_bound(agents, D, R)
+			log_record("INFO", "bound", food = Food, matches = MATCH_BOUNDS[Food], donors = len(D))
+	
+	if not complete:
+	
+		if checkpoint_settings == 'ON':
+		
+			checkpoint = partial(save_matching_checkpoint, agents, Food, M, D, R, V, capacity)
+			checkpoint(cursor)
+		
+		else:
+		
+			checkpoint = None
+		
+		#	Match donor and receivers	#
+		record_phase(Food, "matching", engine = matching_settings, cursor = cursor)
+		set_metric('pass_receivers', len(R))
+		set_metric('pass_receivers_done', cursor)
+		
+		if matching_settings in ['RECEIVER_DA', 'DONOR_DA']:
+		
+			M, D = match_deferred_acceptance(C, D, R, M, proposer = matching_settings.split('_')[0])
+			add_metric('receivers_processed_total', len(R) - cursor)
+			set_metric('pass_receivers_done', len(R))
+		
+		elif matching_settings == 'MAXIMUM':
+		
+			M, D = match_maximum(C, D, R, M)
+			add_metric('receivers_processed_total', len(R) - cursor)
+			set_metric('pass_receivers_done', len(R))
+		
+		else:
+		
+			match_greedy(C, D, R, M, cursor, checkpoint)
+		
+		#	Capacitated volunteer routing	#
+		if routing_settings == 'CAPACITATED':
+		
+			record_phase(Food, "routing", matches = len(M))
+			V[:] = capacity[0]
 			
-				vicinity = Tpnm
+			for volunteer in V:
 			
-			else:
+				agents[volunteer].amount = capacity[1][volunteer]
 			
-				vicinity = Tnp
+			M = route_volunteers(agents, M, V, indexes)
 		
-		else:
+		if checkpoint_settings == 'ON':
 		
-			for volunteer in v_prime:
-			
-				volunteer_agent = get_agent(C, volunteer)
-				
-				if Food != 'P':
-				
-					vicinity = int(math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 
-											+ (volunteer_agent.starty - volunteer_agent.endy) ** 2))
-				
-				else:
-				
-					if volunteer_agent.transac == 'AC':
-					
-						vicinity = int(math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 
-											+ (volunteer_agent.starty - volunteer_agent.endy) ** 2))
-					
-					else:
-					
-						if volunteer_agent.transtype == 'MOTORED':
-						
-							vicinity = Tpm
-						
-						else:
-						
-							vicinity = Tpnm
-				
-				if vicinity > donor_agent.vicinity:
-				
-					donor_agent.vicinity = vicinity
-					match_index = [i for i, match in enumerate(M) if match[0] == donor_agent.agentid]
-					
-					if len(match_index) > 0:
-					
-						M[match_index[0]] = (donor_agent.agentid, volunteer_agent.agentid)
-					
-					else:
-					
-						M.append((donor_agent.agentid, volunteer_agent.agentid))
+			save_matching_checkpoint(agents, Food, M, D, R, V, capacity, len(R), complete = True)
 	
-		try:
-		
-			match_index = [i for i, match in enumerate(M) if match[0] == donor_agent.agentid]
-			matched_volunteer_agent = get_agent(C, M[match_index[0]][1])
+	record_phase(Food, "done", matches = len(M))
+	
+	#	Return matching and remaining agents	#
+	return M, D, R, V
+
+
+
+#	Find the volunteers each donor can reach, capacity aside	#
+def find_volunteer_reach(C, D, V, connection):
+
+	global ROAD_DISK_CACHE
+
+	#	Only the matching process writes the disk cache	#
+	ROAD_DISK_CACHE = {}
+	agents = {agent.agentid: agent for agent in C}
+	reach = {}
+
+	for donor in D:
+
+		reach[donor] = [volunteer for volunteer in V if volunteer_reaches(agents[donor], agents[volunteer])]
+
+	connection.send(reach)
+	connection.close()
+
+
+#	Match perishable, then non-perishable food	#
+def match_food_classes(C, PFD, PFR, NPFD, NPFR, V, indexes = None):
+
+	concurrent_setting = CONCURRENT
+	reach = None
+
+	#	Parallel reach search: volunteer reach of non-perishable donors is found while perishable food is matched	#
+	if concurrent_setting == 'ON' and len(NPFD) > 0:
+
+		receiver, sender = multiprocessing.Pipe(duplex = False)
+		process = multiprocessing.Process(target = run_worker, args = (find_volunteer_reach, C, NPFD, list(V), sender))
+		process.start()
+		sender.close()
+
+	Mp, PFD, PFR, V = match_requests(C, PFD, PFR, V, Food = 'P', indexes = indexes)
+	Mp = [the_tuple for the_tuple in Mp if (the_tuple[-1] in PFR)]
+
+	#	Perishable food keeps priority, non-perishable donors only take reachable volunteers and capacity it left	#
+	if concurrent_setting == 'ON' and len(NPFD) > 0:
+
+		reach = receiver.recv()
+		process.join()
+
+	Mnp, NPFD, NPFR, V = match_requests(C, NPFD, NPFR, V, Food = '', indexes = indexes, reach = reach)
+	Mnp = [the_tuple for the_tuple in Mnp if (the_tuple[-1] in NPFR)]
+
+	return Mp, PFD, PFR, Mnp, NPFD, NPFR, V
+
+
+#	Get agents per chunk within the memory budget	#
+def get_chunk_size(num_requests):
+
+	budget = MEMORY_BUDGET_MB * 1024 ** 2
+	
+	#	Preference lists grow with the square of the chunk, about 24 bytes per entry, in a quarter of the budget	#
+	return max(1, min(num_requests, AGENTS, int(math.sqrt(budget/4/24))))
+
+
+#	Generate agent requests in chunks	#
+def generate_agent_chunks(num_requests, chunk_size):
+
+	for first_id in range(0, num_requests, chunk_size):
+	
+		yield generate_and_classify_agents(min(chunk_size, num_requests - first_id), first_id = first_id, save = False)[0]
+
+
+#	Read saved agent requests in chunks	#
+def read_agent_chunks(chunk_size):
+
+	load = DATA_LOAD_LOCATION
+	
+	with open(load + "_agent_requests.txt", "r") as fp:
+	
+		while True:
+		
+			C = [parse_agent_request(line) for line in itertools.islice(fp, chunk_size)]
 			
-			if matched_volunteer_agent.amount < 2 * Tm:
+			if len(C) == 0:
 			
-				V.remove(M[match_index[0]][1])
+				return
 			
-			else:
+			#	Empty preference lists are read as ['']	#
+			for agent in C:
 			
-				matched_volunteer_agent.amount = matched_volunteer_agent.amount - Tm
-		
-		except Exception:
-		
-			pass
-	
+				agent.pref = [preference for preference in agent.pref if preference != '']
+			
+			yield C
+
+
+#	Write agent chunks to memory-mapped column files	#
+def write_agent_stream(chunks, save, digest = None):
+
+	store = DATA_STORE_LOCATION
+	shutil.rmtree(store + "_stream", ignore_errors = True)
+	os.makedirs(store + "_stream")
+	files, count, pref_count = {}, 0, 0
+	text = open(store + "_agent_requests.txt", "w") if save else None
 	
-	#	Match receivers	#
-	#	Update receiver preferences#
-	preference_settings = PREFERENCE
-	receiver_sort_settings = SORTING
+	#	Column types fixed up front, chunks of whole numbers still share float columns	#
+	dtypes = dict({name: np.dtype(np.float64).str for name in ['amount', 'startx', 'starty', 'startt', 'endt', 'endx', 'endy']},
+					**{name: np.dtype(np.int8).str for name in AGENT_CODES}, **{name: np.dtype(np.int64).str for name in ['agentid', 'pref_offsets', 'pref_indices']})
 	
-	for receiver in R:
+	try:
 	
-		receiver_agent = get_agent(C, receiver)		
-		original_pref = receiver_agent.m_pref
-		eligibility = []
-		
-		for donor in D:
+		for C in chunks:
 		
-			donor_agent = get_agent(C, donor)
-			d_to_r_distance = math.sqrt((donor_agent.startx - receiver_agent.startx) ** 2 + (donor_agent.starty - receiver_agent.starty) ** 2)
+			columns = get_agent_columns(C)
 			
-			if d_to_r_distance <= donor_agent.vicinity:
+			#	Continue preference offsets of earlier chunks	#
+			columns['pref_offsets'] = columns['pref_offsets'][(1 if count > 0 else 0):] + pref_count
+			pref_count = pref_count + len(columns['pref_indices'])
 			
-				if ((receiver_sort_settings == 'START' and donor_agent.endt < receiver_agent.startt)
-					or (receiver_sort_settings == 'END' and donor_agent.endt < receiver_agent.endt)):
+			for name, array in columns.items():
 			
-					eligibility.append(donor_agent.agentid)
-		
-		eligible_not_preferred = [agent for agent in eligibility if agent not in original_pref]
-		eligible_not_preferred.sort(key=lambda x: (get_agent(C, x).startt, x))
-		
-		if preference_settings == 'ORIGINAL':
-		
-			receiver_agent.m_pref = [agent for agent in original_pref if agent in eligibility]
+				if name not in files:
+				
+					files[name] = open(store + "_stream/" + name + ".bin", "wb")
+				
+				files[name].write(array.astype(dtypes[name], casting = 'safe').tobytes())
+			
+			if text is not None or digest is not None:
+			
+				lines = [str(agent.get_details()) + "\n" for agent in C]
+				[text.write(line) for line in lines if text is not None]
+				[digest.update(line.encode()) for line in lines if digest is not None]
+			
+			count = count + len(C)
+	
+	finally:
+	
+		for fp in files.values():
 		
-		elif preference_settings in ['ELIGIBLE', 'UPDATED']:
+			fp.close()
 		
-			receiver_agent.m_pref = [agent for agent in original_pref if agent in eligibility] + eligible_not_preferred
+		if text is not None:
 		
-	#	Update donor preferences#
-	for donor in D:
+			text.close()
 	
-		donor_agent = get_agent(C, donor)
-		original_pref = donor_agent.m_pref
-		volunteer = [the_tuple[1] for the_tuple in M if (the_tuple[0] == donor)]
-		
-		if len(volunteer) != 0:
+	with open(store + "_stream/columns.json", "w") as fp:
+	
+		json.dump({'agents': count, 'dtypes': dtypes}, fp)
+	
+	return count
+
+
+#	Open memory-mapped agent columns	#
+def open_agent_stream():
+
+	load = DATA_STORE_LOCATION + "_stream/"
+	columns = {}
+	
+	with open(load + "columns.json", "r") as fp:
+	
+		meta = json.load(fp)
+	
+	for name, dtype in meta['dtypes'].items():
+	
+		if os.path.getsize(load + name + ".bin") > 0:
 		
-			volunteer_agent = get_agent(C, volunteer[0])
-			v_s_to_e_distance = math.sqrt((volunteer_agent.startx - volunteer_agent.endx) ** 2 + (volunteer_agent.starty - volunteer_agent.endy) ** 2)
+			columns[name] = np.memmap(load + name + ".bin", dtype = dtype, mode = 'r')
 		
 		else:
 		
-			v_s_to_e_distance = 0
+			columns[name] = np.zeros(0, dtype = dtype)
+	
+	return columns
+
+
+#	Get preference list of an agent row	#
+def get_stream_pref(columns, row):
+
+	return columns['pref_indices'][columns['pref_offsets'][row]:columns['pref_offsets'][row + 1]]
+
+
+#	Index available volunteers by start cell	#
+def build_stream_volunteers(columns, volunteer_setting):
+
+	rows = np.flatnonzero(columns['agenttype'] == AGENT_CODES['agenttype'].index('V'))
+	rows = np.array(random.sample(rows.tolist(), int(len(rows) * round(get_v_settings(volunteer_setting)/get_v_settings('32X'), 5))), dtype = np.int64)
+	rows.sort()
+	startx, starty = columns['startx'][rows], columns['starty'][rows]
+	keys = (startx // GRID_CELL).astype(np.int64) * 2 ** 32 + (starty // GRID_CELL).astype(np.int64)
+	order = np.argsort(keys, kind = 'stable')
+	limits = (Tl/100) * np.hypot(startx - columns['endx'][rows], starty - columns['endy'][rows])
+	
+	return {'rows': rows[order], 'keys': keys[order], 'limits': limits[order], 'amounts': columns['amount'][rows[order]].astype(np.float64),
+			'active': np.ones(len(rows), dtype = bool), 'rings': int(math.ceil(limits.max()/GRID_CELL)) if len(limits) > 0 else 0}
+
+
+#	Assign a volunteer to a donor from the volunteer start cell index	#
+def assign_stream_volunteer(columns, volunteers, donor, Food):
+
+	x, y, amount = columns['startx'][donor].item(), columns['starty'][donor].item(), columns['amount'][donor].item()
+	startt, endt, donorid = columns['startt'][donor], columns['endt'][donor], columns['agentid'][donor]
+	cell_x, cell_y, rings = int(x // GRID_CELL), int(y // GRID_CELL), volunteers['rings']
+	
+	#	Volunteers starting in nearby cells	#
+	candidates = np.concatenate([np.arange(*np.searchsorted(volunteers['keys'], [cx * 2 ** 32 + cell_y - rings, cx * 2 ** 32 + cell_y + rings + 1]))
+								for cx in range(cell_x - rings, cell_x + rings + 1)]).astype(np.int64)
+	rows = volunteers['rows'][candidates]
+	v_startt, v_endt = columns['startt'][rows], columns['endt'][rows]
+	eligible = (volunteers['active'][candidates] & (volunteers['amounts'][candidates] >= (1 + Ta/100) * amount)
+				& (np.hypot(columns['startx'][rows] - x, columns['starty'][rows] - y) <= volunteers['limits'][candidates])
+				& (startt < v_endt) & (v_startt < endt) & ((v_endt - startt >= To) | (endt - v_startt >= To)))
+	candidates = candidates[eligible]
+	vicinity, chosen = -1, -1
+	
+	for i in candidates[np.argsort(volunteers['rows'][candidates], kind = 'stable')]:
+	
+		row = volunteers['rows'][i]
+		pref = get_stream_pref(columns, row)
 		
-		neighbourhood = []
+		if len(pref) > 0 and not np.any(pref == donorid):
 		
-		for receiver in R:
+			continue
 		
-			receiver_agent = get_agent(C, receiver)
-			d_to_r_distance = math.sqrt((donor_agent.startx - receiver_agent.startx) ** 2 + (donor_agent.starty - receiver_agent.starty) ** 2)
-			
-			if len(volunteer) != 0:
-			
-				twice_triangle_area = abs((volunteer_agent.startx - volunteer_agent.endx) * (volunteer_agent.endy - receiver_agent.endy) - (volunteer_agent.starty - volunteer_agent.endy) * (volunteer_agent.endx - receiver_agent.endx))
-				off_routing_distance = twice_triangle_area/v_s_to_e_distance
-			
-			else:
-			
-				off_routing_distance = -1
-			
-			if (d_to_r_distance <= donor_agent.vicinity and (off_routing_distance <= (Tl/100) * v_s_to_e_distance)):
-				
-				if ((receiver_sort_settings == 'START' and donor_agent.endt < receiver_agent.startt)
-					or (receiver_sort_settings == 'END' and donor_agent.endt < receiver_agent.endt)):
-				
-					neighbourhood.append(receiver_agent.agentid)
+		if DISTANCE == 'ROAD' and get_distance(x, y, columns['startx'][row], columns['starty'][row], volunteers['limits'][i]) > volunteers['limits'][i]:
 		
-		neighbour_not_preferred = [agent for agent in neighbourhood if agent not in original_pref]
+			continue
 		
-		if receiver_sort_settings == 'START':
+		if Food != 'P' or AGENT_CODES['transac'][columns['transac'][row]] == 'AC':
 		
-			neighbour_not_preferred.sort(key=lambda x: (get_agent(C, x).startt, x))
+			volunteer_vicinity = int(math.sqrt((columns['startx'][row] - columns['endx'][row]) ** 2 + (columns['starty'][row] - columns['endy'][row]) ** 2))
 		
-		else:
+		elif AGENT_CODES['transtype'][columns['transtype'][row]] == 'MOTORED':
 		
-			neighbour_not_preferred.sort(key=lambda x: (get_agent(C, x).endt, x))
+			volunteer_vicinity = Tpm
 		
-		if preference_settings == 'ORIGINAL':
+		else:
 		
-			receiver_agent.m_pref = [agent for agent in original_pref if agent in neighbourhood]
+			volunteer_vicinity = Tpnm
 		
-		elif preference_settings in ['ELIGIBLE', 'UPDATED']:
+		if volunteer_vicinity > vicinity:
 		
-			receiver_agent.m_pref = [agent for agent in original_pref if agent in neighbourhood] + neighbour_not_preferred
+			vicinity, chosen = volunteer_vicinity, i
 	
+	if chosen < 0:
 	
-	#	Receiver sorting #
-	if receiver_sort_settings == 'START':
+		return -1, -1
 	
-		R.sort(key=lambda x: (get_agent(C, x).startt, x))
+	#	Use up volunteer payload	#
+	if volunteers['amounts'][chosen] < 2 * Tm:
+	
+		volunteers['active'][chosen] = False
 	
 	else:
 	
-		R.sort(key=lambda x: (get_agent(C, x).endt, x))
+		volunteers['amounts'][chosen] = volunteers['amounts'][chosen] - Tm
 	
-	#	Match donor and receivers	#
-	for receiver in R:
+	return vicinity, columns['agentid'][volunteers['rows'][chosen]].item()
+
+
+#	Match requests of a food type from memory-mapped agent columns	#
+def match_stream(columns, volunteers, Food, fp):
+
+	preference_settings, receiver_sort_settings = PREFERENCE, SORTING
+	ftype = AGENT_CODES['ftype'].index('P' if Food == 'P' else 'NP')
+	agentid, endt = columns['agentid'], columns['endt']
+	keys = columns['startt'] if receiver_sort_settings == 'START' else columns['endt']
 	
-		receiver_agent = get_agent(C, receiver)
-		receiver_pref = [agent for agent in receiver_agent.m_pref if agent in D]
-		match_donor_position = -1
-		best_preference = -1
+	#	Receivers in sorting order, donors in order of becoming eligible	#
+	D = np.flatnonzero((columns['agenttype'] == AGENT_CODES['agenttype'].index('D')) & (columns['ftype'] == ftype))
+	R = np.flatnonzero((columns['agenttype'] == AGENT_CODES['agenttype'].index('R')) & (columns['ftype'] == ftype))
+	D = D[np.lexsort((agentid[D], endt[D]))]
+	R = R[np.lexsort((agentid[R], keys[R]))]
+	record_phase(Food, "matching", engine = 'STREAM', receivers = len(R))
+	set_metric('pass_receivers', len(R))
+	
+	#	Receivers preferred by each donor with their positions	#
+	starts = columns['pref_offsets'][D]
+	lengths = columns['pref_offsets'][D + 1] - starts
+	positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+	preferred = columns['pref_indices'][np.repeat(starts, lengths) + positions]
+	order = np.argsort(preferred, kind = 'stable')
+	preferred, preferring, positions = preferred[order], np.repeat(np.arange(len(D)), lengths)[order], positions[order]
+	
+	#	Donor working set	#
+	vicinities, matched_volunteers = np.full(len(D), -1.0), np.full(len(D), -1, dtype = np.int64)
+	working = np.zeros(0, dtype = np.int64)
+	x, y, startt, ids = columns['startx'][D].astype(np.float64), columns['starty'][D].astype(np.float64), columns['startt'][D], agentid[D]
+	admitted, matched, used = 0, 0, set()
+	
+	for position, receiver in enumerate(R):
+	
+		receiverid = agentid[receiver].item()
+		add_metric('receivers_processed_total')
+		set_metric('pass_receivers_done', position + 1)
 		
-		for i, donor in enumerate(receiver_pref):
+		#	Admit donors ending before the receiver, those without a volunteer reach no receiver	#
+		first = admitted
 		
-			donor_agent = get_agent(C, donor)
-			
-			try:
-			
-				current_position = donor_agent.m_pref.index(receiver)
-				
-				if (current_position < best_preference or match_donor_position < 0):
-				
-					match_donor_position = i
-					best_preference = current_position
-			
-			except Exception:
-			
-				pass
+		while admitted < len(D) and endt[D[admitted]] < keys[receiver]:
 		
-		try:
+			vicinities[admitted], matched_volunteers[admitted] = assign_stream_volunteer(columns, volunteers, D[admitted], Food)
+			admitted = admitted + 1
 		
-			match_index = [i for i, match in enumerate(M) if match[0] == receiver_pref[match_donor_position]]
-			match_tuples = [match for i, match in enumerate(M) if match[0] == receiver_pref[match_donor_position]]
-			M[match_index[0]] = (receiver_pref[match_donor_position], M[match_index[0]][1], receiver_agent.agentid)
-			D.remove(M[match_index[0]][0])
+		if admitted > first:
 		
-		except Exception:
+			arrivals = np.arange(first, admitted)
+			working = np.concatenate([working, arrivals[vicinities[arrivals] >= 0]])
 		
-			try:
-			
-				M.append((receiver_pref[match_donor_position], receiver_agent.agentid))
-				D.remove(M[match_index[0]][0])
-			
-			except Exception:
-			
-				pass
-
+		#	Eligible donors in the working set	#
+		eligibility = working[np.hypot(x[working] - columns['startx'][receiver], y[working] - columns['starty'][receiver]) <= vicinities[working]]
+		
+		if DISTANCE == 'ROAD':
+		
+			eligibility = np.array([donor for donor in eligibility if get_distance(x[donor], y[donor], columns['startx'][receiver], columns['starty'][receiver], vicinities[donor]) <= vicinities[donor]], dtype = np.int64)
+		
+		if len(eligibility) == 0:
+		
+			continue
+		
+		#	Receiver preference over eligible donors	#
+		pref = get_stream_pref(columns, receiver)
+		eligible_ids = ids[eligibility]
+		order = np.argsort(eligible_ids)
+		in_pref = pref[np.isin(pref, eligible_ids)]
+		receiver_pref = eligibility[order[np.searchsorted(eligible_ids, in_pref, sorter = order)]]
+		
+		if preference_settings in ['ELIGIBLE', 'UPDATED']:
+		
+			not_preferred = eligibility[~np.isin(eligible_ids, pref)]
+			receiver_pref = np.concatenate([receiver_pref, not_preferred[np.lexsort((ids[not_preferred], startt[not_preferred]))]])
+		
+		if len(receiver_pref) == 0:
+		
+			continue
+		
+		#	Donor ranking the receiver best, else the last preferred	#
+		low, high = np.searchsorted(preferred, [receiverid, receiverid + 1])
+		ranks = {donor: i for i, donor in enumerate(receiver_pref.tolist())}
+		ranked = [(positions[i], ranks[preferring[i]]) for i in range(low, high) if preferring[i] in ranks]
+		donor = receiver_pref[min(ranked)[1]] if len(ranked) > 0 else receiver_pref[-1]
+		
+		if matched_volunteers[donor] < 0:
+		
+			fp.write(str((ids[donor].item(), receiverid)) + "\n")
+		
+		else:
+		
+			fp.write(str((ids[donor].item(), matched_volunteers[donor].item(), receiverid)) + "\n")
+			used.add(matched_volunteers[donor].item())
+		
+		#	Matched donors leave the working set	#
+		working = working[working != donor]
+		matched = matched + 1
 	
-	#	Return matching and remaining agents	#
-	return M, D, R, V
+	#	Donors eligible for no receiver still take volunteers	#
+	while admitted < len(D):
+	
+		vicinities[admitted], matched_volunteers[admitted] = assign_stream_volunteer(columns, volunteers, D[admitted], Food)
+		admitted = admitted + 1
+	
+	record_phase(Food, "done", matches = matched)
+	
+	return matched, len(D), len(R), used
+
+
+#	Generate or read agent requests and match them out of core	#
+def run_stream(agent_auto_generate, seed, run_start):
 
+	save_setting, v_setting, pref_setting, sort_setting, store_setting = SAVE, VOLUNTEERS, PREFERENCE, SORTING, RESULT_STORE
+	distance_setting = DISTANCE
+	store = DATA_STORE_LOCATION
+	digest = hashlib.sha1() if store_setting == 'ON' else None
+	
+	#	Agent requests to memory-mapped columns	#
+	if agent_auto_generate.upper() == 'Y':
+	
+		num_requests = get_num_requests()
+		num_agents = write_agent_stream(generate_agent_chunks(num_requests, get_chunk_size(num_requests)), save_setting == 'ON', digest)
+	
+	else:
+	
+		num_agents = write_agent_stream(read_agent_chunks(get_chunk_size(math.inf)), False, digest)
+	
+	columns = open_agent_stream()
+	volunteers = build_stream_volunteers(columns, v_setting)
+	
+	#	Match perishable, then non-perishable	#
+	with open(store + "_matched_requests.txt", "w") as fp:
+	
+		c_Mp, c_PFD, c_PFR, used_p = match_stream(columns, volunteers, 'P', fp)
+		c_Mnp, c_NPFD, c_NPFR, used_np = match_stream(columns, volunteers, '', fp)
+	
+	add_metric('runs_completed_total')
+	
+	c_V = len(volunteers['rows'])
+	
+	#	Display counts	#
+	print_locked("\nAGENT COUNTS:\t\t\t", c_PFD + c_NPFD + c_PFR + c_NPFR + c_V)
+	print_locked("Perishable donors:\t\t", c_PFD)
+	print_locked("Non-perishable donors:\t\t", c_NPFD)
+	print_locked("Perishable receivers:\t\t", c_PFR)
+	print_locked("Non-perishable receivers:\t", c_NPFR)
+	print_locked("Volunteers:\t\t\t", c_V, "(", round(get_v_settings(v_setting)/2), "X donors )")
+	
+	#	Display matches	#
+	print_locked("\nAGENTS MATCHED:\t\t\t", c_Mp + c_Mnp, "/", c_PFD + c_NPFD, "(", round(100 * (c_Mp + c_Mnp)/max(c_PFD + c_NPFD, 1), 2), "% )")
+	print_locked("Perishable:\t\t\t", c_Mp, "/", c_PFD, "(", round(100 * c_Mp/max(c_PFD, 1), 2), "% )")
+	print_locked("Non-perishable:\t\t\t", c_Mnp, "/", c_NPFD, "(", round(100 * c_Mnp/max(c_NPFD, 1), 2), "% )")
+	print_locked("\nVOLUNTEERS USED:\t\t", len(used_p | used_np), "/", c_V)
+	
+	#	Store run results	#
+	if store_setting == 'ON':
+	
+		store_run_result({'timestamp': str(datetime.datetime.now()), 'seed': seed, 'dataset': digest.hexdigest(), 'day': 1, 'agents': num_agents,
+							'volunteers': v_setting, 'volunteer_factor': round(get_v_settings(v_setting)/2), 'sorting': sort_setting,
+							'preference': pref_setting, 'matching': 'STREAM', 'routing': 'SINGLE', 'distance': distance_setting,
+							'manipulation': 'OFF', 'settings': json.dumps(get_settings()),
+							'perishable_donors': c_PFD, 'non_perishable_donors': c_NPFD, 'perishable_receivers': c_PFR,
+							'non_perishable_receivers': c_NPFR, 'volunteer_count': c_V, 'perishable_matched': c_Mp, 'non_perishable_matched': c_Mnp,
+							'allocation': 100 * (c_Mp + c_Mnp)/max(c_PFD + c_NPFD, 1), 'perishable_allocation': 100 * c_Mp/max(c_PFD, 1),
+							'non_perishable_allocation': 100 * c_Mnp/max(c_NPFD, 1), 'seconds': time.perf_counter() - run_start})
 
 
 ##  The main function   ##
@@ -656,9 +3337,29 @@ def main():
 
 	#	Get volunteer settings	#
 	save_setting, v_setting, pref_setting, sort_setting, manip_setting = SAVE, VOLUNTEERS, PREFERENCE, SORTING, MANIPULATION
+	match_setting, route_setting, distance_setting, days_setting = MATCHING, ROUTING, DISTANCE, DAYS
+	checkpoint_setting, resume_setting, seed_setting, store_setting, memo_setting = CHECKPOINT, RESUME, SEED, RESULT_STORE, MEMOIZE
+	stream_setting, sensitivity_setting, concurrent_setting, metrics_setting, bound_setting = STREAMING, SENSITIVITY, CONCURRENT, METRICS, BOUND
+	sweep_setting = AVAILABILITY_SWEEP
+	run_snapshot = load_checkpoint('run') if resume_setting == 'ON' else None
+	
+	#	Seed the run	#
+	seed = seed_setting if seed_setting is not None else random.randrange(2 ** 32)
+	seed = run_snapshot['seed'] if run_snapshot is not None else seed
+	random.seed(seed)
 
     #   Auto-generate agent requests   #
-	agent_auto_generate = get_agent_generation_options()
+	resumed = run_snapshot is not None
+	
+	if resumed:
+	
+		#	Saved requests are read, the run keeps its original generation choice	#
+		agent_auto_generate = run_snapshot.get('generated', 'N')
+		print_locked("\nResuming from the last checkpoint with the saved agent requests.")
+	
+	else:
+	
+		agent_auto_generate = get_agent_generation_options()
 	
 	#	Display settings	#
 	print_locked("\n\n\nSETTINGS APPLIED:")
@@ -666,9 +3367,29 @@ def main():
 	print_locked("Volunteer availability:\t\t", v_setting)
 	print_locked("Agent preference used:\t\t", pref_setting)
 	print_locked("Receiver sort timing:\t\t", sort_setting)
+	print_locked("Matching engine:\t\t", match_setting)
+	print_locked("Maximum allocation:\t\t", bound_setting)
+	print_locked("Volunteer routing:\t\t", route_setting)
+	print_locked("Parallel reach search:\t\t", concurrent_setting)
+	print_locked("Travel distances:\t\t", distance_setting)
 	print_locked("Preference manipulation:\t", manip_setting)
+	print_locked("Days simulated:\t\t\t", days_setting)
+	print_locked("Checkpointing:\t\t\t", checkpoint_setting)
+	print_locked("Out-of-core:\t\t\t", stream_setting)
+	print_locked("Live metrics:\t\t\t", metrics_setting)
+	print_locked("Random seed:\t\t\t", seed)
+	start_metrics()
+	set_metric('runs_planned', 1 if stream_setting == 'ON' else days_setting + sum([len(values) for values in sensitivity_setting.values()]) + len(sweep_setting))
+	run_start = time.perf_counter()
+	
+	#	Out-of-core run	#
+	if stream_setting == 'ON':
+	
+		run_stream('N' if resumed else agent_auto_generate, seed, run_start)
+		
+		return
     
-	if agent_auto_generate.upper() != 'Y':
+	if agent_auto_generate.upper() != 'Y' or resumed:
     
 		C, PFD, PFR, NPFD, NPFR, V = read_and_classify_agents()
     	
@@ -676,15 +3397,57 @@ def main():
     
 		num_requests = get_num_requests()
 		C, PFD, PFR, NPFD, NPFR, V = generate_and_classify_agents(num_requests)
+		
+		#	Keep generated requests for resuming	#
+		if checkpoint_setting == 'ON':
+		
+			finish_savers()
+			
+			if save_setting != 'ON':
+			
+				save_agent_requests(C)
+	
+	#	Restore or record the random state of the run	#
+	if resumed and run_snapshot['dataset'] == get_dataset_digest():
+	
+		random.setstate(run_snapshot['random'])
+	
+	else:
+	
+		#	Requests changed since the checkpoint start a fresh run on them	#
+		agent_auto_generate = 'N' if resumed else agent_auto_generate
+		run_snapshot = {'dataset': get_dataset_digest() if checkpoint_setting == 'ON' else None, 'random': random.getstate(), 'previous_matches': None, 'seed': seed,
+						'generated': agent_auto_generate, 'identity': get_dataset_digest() if agent_auto_generate.upper() != 'Y' else get_agents_digest(C)}
+		
+		if checkpoint_setting == 'ON':
+		
+			clear_checkpoint()
+			save_checkpoint('run', run_snapshot)
     
+	#	Dataset identity for the result store	#
+	dataset = run_snapshot.get('identity', get_dataset_digest()) if 'ON' in [store_setting, memo_setting] else None
+	
 	#	Update with volunteer settings	#
+	volunteers = V
 	V = random.sample(V, int(len(V) * round(get_v_settings(v_setting)/get_v_settings('32X'), 5)))
 	
+	#	One volunteer order extending the main sample, drawn apart so the main run keeps its random stream	#
+	if len(sweep_setting) > 0:
+	
+		chosen = set(V)
+		order = V + random.Random(seed).sample([volunteer for volunteer in volunteers if volunteer not in chosen], len(volunteers) - len(V))
+	
 	#	Manipulation	#
 	if manip_setting == 'ON' and agent_auto_generate.upper() != 'Y':
 	
 		working_agents = PFD + PFR + NPFD + NPFR
-		previous_matches = get_matches()
+		previous_matches = run_snapshot['previous_matches'] if run_snapshot['previous_matches'] is not None else get_matches()
+		
+		if checkpoint_setting == 'ON':
+		
+			run_snapshot['previous_matches'] = previous_matches
+			save_checkpoint('run', run_snapshot)
+		
 		common_agents = [agent for agent in working_agents if agent in [y for x in previous_matches for y in x]]
 		manipulated_ids = random.sample(common_agents, random.choice(range(1, len(common_agents))))
 		previous_matches = list(set([the_tuple for the_tuple in previous_matches if (the_tuple[0] in manipulated_ids or the_tuple[1] in manipulated_ids or the_tuple[-1] in manipulated_ids)]))
@@ -698,6 +3461,9 @@ def main():
 	#	Keep counts	#
 	c_PFD, c_PFR, c_NPFD, c_NPFR, c_V = len(PFD), len(PFR), len(NPFD), len(NPFR), len(V)
 	
+	#	Agents before matching for threshold and availability sweeps	#
+	unmatched = copy.deepcopy((C, PFD, PFR, NPFD, NPFR, V)) if len(sensitivity_setting) > 0 or len(sweep_setting) > 0 else None
+	
 	#	Display counts	#
 	print_locked("\nAGENT COUNTS:\t\t\t", c_PFD + c_NPFD + c_PFR + c_NPFR + c_V)
 	print_locked("Perishable donors:\t\t", c_PFD)
@@ -706,24 +3472,61 @@ def main():
 	print_locked("Non-perishable receivers:\t", c_NPFR)
 	print_locked("Volunteers:\t\t\t", c_V, "(", round(get_v_settings(v_setting)/2), "X donors )")
     
-    #	Assign volunteer, update preference and match requests	#
-    #	Perishable	#
-	Mp, PFD, PFR, V = match_requests(C, PFD, PFR, V, Food = 'P')
-	Mp = [the_tuple for the_tuple in Mp if (the_tuple[-1] in PFR)]
+	#	Memoized matches of an identical run	#
+	manipulated = manipulated_ids if manip_setting == 'ON' and agent_auto_generate.upper() != 'Y' else None
+	run_key = get_run_key(dataset, seed, manipulated) if memo_setting == 'ON' and days_setting == 1 else None
+	cached = load_cached_run(run_key) if run_key is not None else None
 	
-    #	Non-perishable	#
-	Mnp, NPFD, NPFR, V = match_requests(C, NPFD, NPFR, V, Food = '')
-	Mnp = [the_tuple for the_tuple in Mnp if (the_tuple[-1] in NPFR)]
+	if cached is not None:
+	
+		Mp, Mnp, bounds = cached
+		print_locked("\nMatches reused from the run cache.")
+	
+	else:
+	
+	    #	Assign volunteer, update preference and match requests	#
+		Mp, PFD, PFR, Mnp, NPFD, NPFR, V = match_food_classes(C, PFD, PFR, NPFD, NPFR, V)
+		bounds = dict(MATCH_BOUNDS)
+		
+		if run_key is not None:
+		
+			store_cached_run(run_key, (Mp, Mnp, bounds))
+	
+	add_metric('runs_completed_total')
 	
 	#	Save matches	#
 	
-	multiprocessing.Process(target=save_matches, args=(Mp + Mnp, )).start()
+	start_saver(save_matches, Mp + Mnp, save_shared_matches, share_matches)
 	
 	#	Display matches	#
 	print_locked("\nAGENTS MATCHED:\t\t\t", len(Mp) + len(Mnp), "/", c_PFD + c_NPFD, "(", round(100 * (len(Mp) + len(Mnp))/(c_PFD + c_NPFD), 2), "% )")
 	print_locked("Perishable:\t\t\t", len(Mp), "/", c_PFD, "(", round(100 * (len(Mp))/(c_PFD), 2), "% )")
 	print_locked("Non-perishable:\t\t\t", len(Mnp), "/", c_NPFD, "(", round(100 * (len(Mnp))/(c_NPFD), 2), "% )")
 	
+	#	Display the maximum allocation	#
+	if len(bounds) == 2:
+	
+		print_locked("\nMAXIMUM MATCHABLE:\t\t", bounds['P'] + bounds[''], "/", c_PFD + c_NPFD, "(", round(100 * (bounds['P'] + bounds[''])/max(c_PFD + c_NPFD, 1), 2), "% )")
+		print_locked("Perishable:\t\t\t", bounds['P'], "/", c_PFD, "(", round(100 * bounds['P']/max(c_PFD, 1), 2), "% )")
+		print_locked("Non-perishable:\t\t\t", bounds[''], "/", c_NPFD, "(", round(100 * bounds['']/max(c_NPFD, 1), 2), "% )")
+	
+	#	Display volunteer usage	#
+	delivered = [the_tuple for the_tuple in Mp + Mnp if len(the_tuple) == 3]
+	used_volunteers = len(set([the_tuple[1] for the_tuple in delivered]))
+	print_locked("\nVOLUNTEERS USED:\t\t", used_volunteers, "/", c_V)
+	print_locked("Deliveries per volunteer:\t", round(len(delivered)/max(used_volunteers, 1), 2))
+	
+	#	Run record	#
+	record = {'timestamp': str(datetime.datetime.now()), 'seed': seed, 'dataset': dataset, 'day': 1, 'agents': len(C),
+				'volunteers': v_setting, 'volunteer_factor': round(get_v_settings(v_setting)/2), 'sorting': sort_setting,
+				'preference': pref_setting, 'matching': match_setting, 'routing': route_setting, 'distance': distance_setting,
+				'manipulation': manip_setting, 'settings': json.dumps(get_settings()),
+				'perishable_donors': c_PFD, 'non_perishable_donors': c_NPFD, 'perishable_receivers': c_PFR,
+				'non_perishable_receivers': c_NPFR, 'volunteer_count': c_V, 'perishable_matched': len(Mp), 'non_perishable_matched': len(Mnp),
+				'allocation': 100 * (len(Mp) + len(Mnp))/max(c_PFD + c_NPFD, 1), 'perishable_allocation': 100 * len(Mp)/max(c_PFD, 1),
+				'non_perishable_allocation': 100 * len(Mnp)/max(c_NPFD, 1),
+				'maximum_allocation': 100 * (bounds['P'] + bounds[''])/max(c_PFD + c_NPFD, 1) if len(bounds) == 2 else None}
+	
 	#	Manipulation	#
 	if manip_setting == 'ON' and agent_auto_generate.upper() != 'Y':
 	
@@ -811,6 +3614,38 @@ def main():
 		print_locked("Lost:\t\t\t\t", worse, "(", round(100 * (worse)/(len(manipulated_ids)), 2), "% )")
 		print_locked("Same:\t\t\t\t", same, "(", round(100 * (same)/(len(manipulated_ids)), 2), "% )")
 		print_locked("Uncomparable:\t\t\t", uncomparable, "(", round(100 * (uncomparable)/(len(manipulated_ids)), 2), "% )")
+		
+		record.update({'manipulated': len(manipulated_ids), 'gained': better, 'lost': worse, 'same': same, 'uncomparable': uncomparable})
+	
+	#	Store run results	#
+	if store_setting == 'ON':
+	
+		record['seconds'] = time.perf_counter() - run_start
+		store_run_result(record)
+	
+	#	Threshold sensitivity	#
+	if len(sensitivity_setting) > 0:
+	
+		run_sensitivity(*unmatched, sensitivity_setting)
+	
+	#	Nested volunteer availability	#
+	if len(sweep_setting) > 0:
+	
+		run_availability(*unmatched[:5], order, sweep_setting, record if store_setting == 'ON' else None)
+	
+	#	Following days	#
+	if days_setting > 1:
+	
+		print_locked("\nFOLLOWING DAYS:\t\t\t", days_setting - 1)
+		simulate_days(C, NPFD, V, len(C), days_setting, record if store_setting == 'ON' else None)
+	
+	#	Release saved data	#
+	finish_savers()
+	
+	#	Run complete	#
+	if checkpoint_setting == 'ON':
+	
+		clear_checkpoint()
 
 
 
@@ -833,21 +3668,13 @@ if __name__=="__main__":
         print_locked("\n\nProgram Name With Path:\n\n" + str(sys.argv[0]), end="\n\n\n")
         
         #   Clear the terminal  #
+        flush_log()
         os.system("clear")
         
-        #   Initiate lock object    #
-        lock = multiprocessing.Lock()
-
-        #   Initiate pool objects   #
-        pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        
         #   Call the main program   #
         start = datetime.datetime.now()
         main()
         print_locked("\nProgram execution time:\t\t", datetime.datetime.now() - start, "hours\n")
-        
-        #   Close Pool object    #
-        pool.close()
 
     except Exception:
     
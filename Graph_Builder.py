@@ -19,19 +19,23 @@ import sys
 import math
 import copy
 import time
-import psutil
+import json
 import shutil
 import random
+import sqlite3
+import hashlib
+import inspect
 import resource
 import datetime
 import traceback
 import itertools
+import statistics
 import numpy as np
 import multiprocessing
+import Log_Writer
 from textwrap import wrap
 from functools import partial
-import matplotlib.pyplot as plt
-from scipy.stats import truncnorm
+from Log_Writer import print_locked, flush_log
 
 
 
@@ -48,6 +52,14 @@ SORTING					= "END"					#START/END							Receiver sorting
 PREFERENCE				= "ELIGIBLE"			#ORIGINAL/ELIGIBLE/UPDATED			Usage of preference lists
 VOLUNTEERS				= "1X"					#1X/2X/4X/8X/16X/32X				Volunteer availability (1/2/4/8/16/32) times donors
 MANIPULATION			= "ON"					#ON/OFF								Manipulation of preferences
+LOG_LEVEL				= "INFO"				#DEBUG/INFO/WARNING/ERROR			Lowest level of log records written
+DATA_SOURCE				= "TEXT"				#TEXT/STORE							Statistics tables or the run result store
+STORE_FILTER			= {"matching": "GREEDY", "routing": "SINGLE", "distance": "EUCLIDEAN"}#Column: value	Slice of stored runs, e.g. add "agents": 5000 ({} aggregates all runs)
+RENDER					= "CHANGED"				#CHANGED/ALL						Render only figures whose data or style changed
+FORMATS					= {"pdf": None, "jpeg": 1000}#Format: dpi					Output formats and resolutions (None keeps the figure dpi)
+CONFIDENCE				= 95					#Percentage							Confidence level of error bars over replicated runs
+BAND					= [5, 95]				#Percentiles						Execution curve band over replicated runs
+MAX_POINTS				= 200					#Number								Volunteer levels plotted before merging dense sweeps
 
 #	Thresholds	#
 To		= 0.25									#Overlap time (hours)
@@ -62,12 +74,22 @@ Tr		= 3										#Process advance start threshold for receivers (hours)
 Tw		= 10									#Match acceptance window (minutes)
 
 #   Do not change   #
-RESOLUTION			= 1000													#Output resolution
-LOCK                = multiprocessing.Lock()								#Multiprocessing lock
 CPU_COUNT           = multiprocessing.cpu_count()							#Logical CPUs
-MEMORY              = math.ceil(psutil.virtual_memory().total/(1024.**3))	#RAM capacity
+MEMORY              = math.ceil(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')/(1024.**3))	#RAM capacity
 DATA_LOAD_LOCATION	= os.path.dirname(sys.argv[0]) + "/Statistics/"			#Data load location
 DATA_STORE_LOCATION	= os.path.dirname(sys.argv[0]) + "/Graphs/"				#Data store location
+RESULTS_LOCATION	= os.path.dirname(sys.argv[0]) + "/_results.db"			#Run result store location
+STORE_QUERIES		= {'StartVSEnd': "SELECT volunteer_factor, AVG(CASE WHEN sorting = 'START' THEN allocation END), AVG(CASE WHEN sorting = 'END' THEN allocation END) "
+							"FROM runs WHERE day = 1 AND preference = 'ELIGIBLE' AND ({slice}) GROUP BY volunteer_factor, dataset, seed ORDER BY volunteer_factor",
+						'OriginalVSEligible': "SELECT volunteer_factor, AVG(CASE WHEN preference = 'ORIGINAL' THEN allocation END), AVG(CASE WHEN preference = 'ELIGIBLE' THEN allocation END) "
+							"FROM runs WHERE day = 1 AND sorting = 'END' AND ({slice}) GROUP BY volunteer_factor, dataset, seed ORDER BY volunteer_factor",
+						'Manipulation': "SELECT volunteer_factor, AVG(100.0 * gained / manipulated), AVG(100.0 * lost / manipulated), AVG(100.0 * same / manipulated), AVG(100.0 * uncomparable / manipulated) "
+							"FROM runs WHERE day = 1 AND manipulated > 0 AND sorting = 'END' AND preference = 'ELIGIBLE' AND ({slice}) GROUP BY volunteer_factor, dataset, seed ORDER BY volunteer_factor",
+						'ExecutionCurve': "SELECT volunteer_factor, AVG(allocation) "
+							"FROM runs WHERE day = 1 AND sorting = 'END' AND preference = 'ELIGIBLE' AND ({slice}) GROUP BY volunteer_factor, dataset, seed ORDER BY volunteer_factor"}		#Result store replicates per volunteer level
+
+#   Log level and location of the shared log writer, next to the statistics   #
+Log_Writer.LOG_LEVEL, Log_Writer.LOG_LOCATION = LOG_LEVEL, DATA_LOAD_LOCATION
 
 
 
@@ -75,66 +97,167 @@ DATA_STORE_LOCATION	= os.path.dirname(sys.argv[0]) + "/Graphs/"				#Data store l
 ##  Function definitions    ##
 
 
-#   Print with lock    #
-def print_locked(*content, sep=" ", end="\n"):
+#   Read a statistics table from text    #
+def read_table(file_name):
 
-	store = DATA_LOAD_LOCATION
-    
-	with open(store + "_Log_File.txt", "a") as log_file:
-	
-		try:
-	    
-			with lock:
-	        
-				print (*content, sep = sep, end = end)
-				print (*content, sep = sep, end = end, file=log_file)
+	load = DATA_LOAD_LOCATION
 
-		except Exception:
-	    
-			with LOCK:
-	        
-				print (*content, sep = sep, end = end)
-				print (*content, sep = sep, end = end, file=log_file)
+	#   Comma separated tables of replicated runs, else whitespace tables   #
+	if os.path.exists(load + file_name + ".csv"):
 
+		return np.loadtxt(load + file_name + ".csv", delimiter = ",", ndmin = 2)
 
-#   Convert string to int or float    #
-def convert(some_value):
+	return np.loadtxt(load + file_name + ".txt", ndmin = 2)
 
-    try:
-        return int(some_value)
-        
-    except ValueError:
-    
-        try:
-        
-            return float(some_value)
-        
-        except ValueError:
-        
-            print_locked(traceback.format_exc())
+
+#   Read per-run statistics from the result store    #
+def query_table(file_name):
+
+	store_filter = STORE_FILTER
+	connection = sqlite3.connect(RESULTS_LOCATION)
+
+	try:
+
+		#   Slice on known columns, values passed as parameters   #
+		columns = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+		unknown = [name for name in store_filter if name not in columns]
+
+		if len(unknown) > 0:
+
+			raise ValueError("STORE_FILTER columns " + ", ".join(unknown) + " are not in the result store")
+
+		condition = " AND ".join([name + " = ?" for name in store_filter]) or "1 = 1"
+		cursor = connection.execute(STORE_QUERIES[file_name].format(slice = condition), list(store_filter.values()))
+		rows = cursor.fetchall()
+
+	finally:
+
+		connection.close()
+
+	return np.array([[value if value is not None else np.nan for value in row] for row in rows], dtype = float).reshape(len(rows), len(cursor.description))
+
+
+#   Summarise replicated runs per volunteer level    #
+def summarise_table(data, max_points):
+
+	confidence, band = CONFIDENCE, BAND
+	levels, inverse = np.unique(data[:, 0], return_inverse = True)
+
+	#   Merge neighbouring levels of dense sweeps   #
+	if len(levels) > max_points:
+
+		groups = np.arange(len(levels)) * max_points // len(levels)
+		levels = np.bincount(groups, weights = levels) / np.bincount(groups)
+		inverse = groups[inverse]
+
+	order = np.argsort(inverse, kind = 'stable')
+	splits = np.flatnonzero(np.diff(inverse[order])) + 1
+	z = statistics.NormalDist().inv_cdf(0.5 + confidence / 200)
+	summary = {'levels': levels, 'mean': [], 'ci': [], 'low': [], 'high': [], 'runs': []}
+
+	for values in np.split(data[order, 1:], splits) if len(data) > 0 else []:
+
+		present = ~np.isnan(values)
+		runs = present.sum(axis = 0)
+		mean = np.nansum(values, axis = 0) / np.maximum(runs, 1)
+		deviation = np.sqrt(np.nansum((values - mean) ** 2, axis = 0) / np.maximum(runs - 1, 1))
+		summary['mean'].append(mean)
+		summary['ci'].append(np.where(runs > 1, z * deviation / np.sqrt(np.maximum(runs, 1)), 0))
+		summary['low'].append([np.percentile(values[present[:, column], column], band[0]) if runs[column] > 0 else mean[column] for column in range(values.shape[1])])
+		summary['high'].append([np.percentile(values[present[:, column], column], band[1]) if runs[column] > 0 else mean[column] for column in range(values.shape[1])])
+		summary['runs'].append(int(runs.max()))
+
+	#   Columns of statistics across levels   #
+	for key in ['mean', 'ci', 'low', 'high']:
+
+		summary[key] = np.array(summary[key]).reshape(len(levels), data.shape[1] - 1).T
+
+	return summary
+
+
+#   Tick labels of volunteer levels   #
+def get_level_labels(levels):
+
+	return [str(int(level)) if float(level).is_integer() else str(round(level, 2)) for level in levels]
+
+
+#   Load a statistics table from the configured source    #
+def load_table(file_name):
+
+	if DATA_SOURCE == 'STORE':
+
+		return query_table(file_name)
+
+	return read_table(file_name)
+
+
+#   Load plotting with the headless backend   #
+def get_pyplot():
+
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	return plt
+
+
+#   Digest of figure data and style   #
+def get_render_digest(data, fig_name, purpose, extension, dpi):
+
+	style = "".join([inspect.getsource(function) for function in [get_pyplot, display_bar_graph, autolabel, display_line_graph]])
+
+	return hashlib.sha1((style + json.dumps([data, fig_name, purpose, extension, dpi])).encode()).hexdigest()
+
+
+#   Load digests of rendered figures   #
+def load_render_digests():
+
+	store = DATA_STORE_LOCATION
+
+	try:
+
+		with open(store + "_rendered.json", "r") as fp:
+
+			return json.load(fp)
+
+	except (FileNotFoundError, ValueError):
+
+		return {}
+
+
+#   Save digests of rendered figures   #
+def save_render_digests(rendered):
+
+	store = DATA_STORE_LOCATION
+
+	with open(store + "_rendered.json", "w") as fp:
+
+		json.dump(rendered, fp, indent = 1, sort_keys = True)
+
+
+#   Render one figure in one format   #
+def render_figure(data, fig_name, purpose, extension, dpi, digest):
+
+	if purpose is None:
+
+		display_line_graph(data, fig_name, extension, dpi)
+
+	else:
+
+		display_bar_graph(data, fig_name, purpose, extension, dpi)
+
+	return fig_name + "." + extension, digest
 
 
 #   Display execution data in a graph   #
-def display_bar_graph(file_name, fig_name, purpose):
+def display_bar_graph(data, fig_name, purpose, extension, dpi):
 
-	load, store = DATA_LOAD_LOCATION, DATA_STORE_LOCATION
-	volunteer, data, y_axis = [], [], []
-    
-    #   Read data   #
-	with open(load + file_name + ".txt", "r") as fp:
-        
-		for line in fp:
-        
-			pieces = [convert(stat) for stat in line.strip().split()]
-			data.append(pieces)
+	store = DATA_STORE_LOCATION
+	summary = summarise_table(data, MAX_POINTS)
+	volunteer, y_axis, errors = summary['levels'], summary['mean'], summary['ci']
 	
-	for each_entry in data:
-    
-		volunteer.append(each_entry[0])
-		
-		y_axis.append(each_entry[1:])
-    
-	y_axis = list(zip(*y_axis))
+    #   Load plotting on use   #
+	plt = get_pyplot()
 	
     #   Create the figure   #
 	comparision = plt.figure(fig_name)
@@ -142,28 +265,30 @@ def display_bar_graph(file_name, fig_name, purpose):
 	if purpose == 'SORTING':
     
 		labels = ['START', 'END']
-		ax = plt.subplot(111, ylim=(0, 100))
+		ax = plt.subplot(111, ylim=(0, max(100, 1.2 * np.max(y_axis + errors, initial = 0))))
     
 	elif purpose == 'PREFERENCES':
     
 		labels = ['ORIGINAL', 'ELIGIBLE']
-		ax = plt.subplot(111, ylim=(0, 100))
+		ax = plt.subplot(111, ylim=(0, max(100, 1.2 * np.max(y_axis + errors, initial = 0))))
     
 	elif purpose == 'MANIPULATION':
     
 		labels = ['GAIN', 'LOSS', 'SAME', 'NONE']
-		ax = plt.subplot(111, ylim=(0, 120))
+		ax = plt.subplot(111, ylim=(0, max(120, 1.2 * np.max(y_axis + errors, initial = 0))))
 	
 	width = 40
 	bars = []
 	colors = ['b', 'g', 'r', 'y']
+	positions = 200 * np.arange(len(volunteer))
 	
 	for row in range(len(y_axis)):
 	
-		bars.append(ax.bar([200 * math.log2(each) - int(len(y_axis)/2) * width + row * width for each in volunteer], y_axis[row], width=width, color=colors[row], align='center'))
+		bars.append(ax.bar(positions - int(len(y_axis)/2) * width + row * width, y_axis[row], width=width, color=colors[row], align='center',
+							yerr=errors[row] if max(summary['runs'], default = 0) > 1 else None, capsize=2))
 	
-	ax.set_xticks([200 * math.log2(each) - width/2 for each in volunteer])
-	ax.set_xticklabels([tick for tick in volunteer])
+	ax.set_xticks(positions - width/2)
+	ax.set_xticklabels(get_level_labels(volunteer))
 	ax.set_yticks([0, 20, 40, 60, 80, 100])
 	ax.set_yticklabels(['0', '20', '40', '60', '80', '100'])
 	
@@ -180,55 +305,60 @@ def display_bar_graph(file_name, fig_name, purpose):
 		ax.legend(bars, labels, loc='upper center', title='Preference Manipulation')
     
 	#   Customize plot   #
-	[autolabel(bars[row], ax) for row in range(len(bars))]
+	if len(volunteer) <= 8:
+	
+		[autolabel(bars[row], ax, errors[row]) for row in range(len(bars))]
+	
+	else:
+	
+		plt.setp(ax.get_xticklabels(), rotation='vertical')
 	
 	plt.ylabel('Allocated Agents ( % ) -->\n')
 	plt.xlabel('\nVolunteer Availability ( × Donors ) -->')
 	plt.tight_layout(pad=1.0, w_pad=1.0, h_pad=1.0)
     
-	comparision.savefig(store + fig_name + ".pdf", bbox_inches='tight')
-	comparision.savefig(store + fig_name + ".jpeg", bbox_inches='tight', dpi=RESOLUTION)
+	comparision.savefig(store + fig_name + "." + extension, bbox_inches='tight', dpi=dpi or 'figure')
+	plt.close(comparision)
 
 
 #	Heights of bars	#
-def autolabel(rects, ax):
+def autolabel(rects, ax, errors):
 
-	for rect in rects:
+	for rect, error in zip(rects, errors):
     
 		h = rect.get_height()
-		ax.text(rect.get_x()+rect.get_width()/2., 1.05*h, '%.2f'%float(h) + " %", ha='center', va='bottom', rotation='vertical')
+		ax.text(rect.get_x()+rect.get_width()/2., 1.05*(h + error), '%.2f'%float(h) + " %", ha='center', va='bottom', rotation='vertical')
 
 
 #   Display execution data in a graph   #
-def display_line_graph(file_name, fig_name):
+def display_line_graph(data, fig_name, extension, dpi):
 
-	load, store = DATA_LOAD_LOCATION, DATA_STORE_LOCATION
-	volunteer, data, y_axis = [], [], []
-    
-    #   Read data   #
-	with open(load + file_name + ".txt", "r") as fp:
-        
-		for line in fp:
-        
-			pieces = [convert(stat) for stat in line.strip().split()]
-			data.append(pieces)
+	store = DATA_STORE_LOCATION
+	summary = summarise_table(data, MAX_POINTS)
+	volunteer, y_axis = summary['levels'], summary['mean'][0]
+	
+	#   Load plotting on use   #
+	plt = get_pyplot()
 	
-	for each_entry in data:
-    
-		volunteer.append(each_entry[0])
-		
-		y_axis.append(each_entry[1:])
-    
 	#   Create the figure   #
 	comparision = plt.figure(fig_name)
-	ax = plt.subplot(111, xlim=(0, 40), ylim=(0, 85))
+	ax = plt.subplot(111, xlim=(0, max(40, 1.1 * np.max(volunteer, initial = 0))), ylim=(0, max(85, 1.1 * np.max(summary['high'][0], initial = 0))))
 	label = 'ALLOCATION ( % )'
 	
-	plot = ax.plot(volunteer, y_axis, label=label, color='g', marker='o')
+	#   Percentile band and confidence of replicated runs   #
+	if max(summary['runs'], default = 0) > 1:
+	
+		ax.fill_between(volunteer, summary['low'][0], summary['high'][0], color='g', alpha=0.2, label=str(BAND[0]) + '-' + str(BAND[1]) + ' PERCENTILE')
+		ax.errorbar(volunteer, y_axis, yerr=summary['ci'][0], fmt='none', ecolor='g', capsize=2)
+	
+	plot = ax.plot(volunteer, y_axis, label=label, color='g', marker='o' if len(volunteer) <= 50 else None)
     
 	#   Customize plot   #
-	ax.set_xticks(volunteer)
-	ax.set_xticklabels([tick for tick in volunteer])
+	if len(volunteer) <= 20:
+	
+		ax.set_xticks(volunteer)
+		ax.set_xticklabels(get_level_labels(volunteer))
+	
 	ax.set_yticks([0, 20, 40, 60, 80])
 	ax.set_yticklabels(['0', '20', '40', '60', '80'])
 	
@@ -237,15 +367,15 @@ def display_line_graph(file_name, fig_name):
 	
 	ax.legend(loc='lower right', title='Agent Allocation vs Volunteer Availability')
 	
-	y_axis = [element[0] for element in y_axis]
+	if len(volunteer) <= 20:
 	
-	for x, y in zip(volunteer, y_axis):
-	
-		plt.text(x + 1, y - 3, str(y) + " %")
+		for x, y in zip(volunteer, y_axis):
+		
+			plt.text(x + 1, y - 3, str(round(y, 2)) + " %")
 
     
-	comparision.savefig(store + fig_name + ".pdf", bbox_inches='tight')
-	comparision.savefig(store + fig_name + ".jpeg", bbox_inches='tight', dpi=RESOLUTION)
+	comparision.savefig(store + fig_name + "." + extension, bbox_inches='tight', dpi=dpi or 'figure')
+	plt.close(comparision)
 
 
 
@@ -254,11 +384,37 @@ def display_line_graph(file_name, fig_name):
 #   Main    #
 def main():
 
-	data_sources = [['StartVSEnd', 'Start_vs_End_Sorting_for_Receivers', 'SORTING'], ['OriginalVSEligible', 'Original_vs_Eligible_Preferences_for_Agents', 'PREFERENCES'], ['Manipulation', 'Manipulation_of_Preferences_by_Agents', 'MANIPULATION'], ['ExecutionCurve', 'Allocation_vs_Volunteer_Availability']]
+	render_setting, format_settings = RENDER, FORMATS
+	data_sources = [['StartVSEnd', 'Start_vs_End_Sorting_for_Receivers', 'SORTING'], ['OriginalVSEligible', 'Original_vs_Eligible_Preferences_for_Agents', 'PREFERENCES'], ['Manipulation', 'Manipulation_of_Preferences_by_Agents', 'MANIPULATION'], ['ExecutionCurve', 'Allocation_vs_Volunteer_Availability', None]]
+	rendered, jobs, skipped = load_render_digests(), [], 0
+	
+	#   Figures and formats to render   #
+	for file_name, fig_name, purpose in data_sources:
+	
+		data = load_table(file_name)
+		
+		for extension, dpi in format_settings.items():
+		
+			digest = get_render_digest(data.tolist(), fig_name, purpose, extension, dpi)
+			
+			if render_setting == 'CHANGED' and rendered.get(fig_name + "." + extension) == digest and os.path.exists(DATA_STORE_LOCATION + fig_name + "." + extension):
+			
+				skipped = skipped + 1
+			
+			else:
+			
+				jobs.append((data, fig_name, purpose, extension, dpi, digest))
 	
-	[display_bar_graph(stat[0], stat[1], stat[2]) for stat in data_sources[:-1]]
+	#   Render in parallel   #
+	if len(jobs) > 0:
 	
-	display_line_graph(data_sources[-1][0], data_sources[-1][1])
+		with multiprocessing.Pool(min(CPU_COUNT, len(jobs))) as pool:
+		
+			rendered.update(pool.starmap(render_figure, jobs))
+		
+		save_render_digests(rendered)
+	
+	print_locked("Figures rendered:\t\t", len(jobs), "( skipped unchanged:", skipped, ")")
 
 
 
@@ -280,21 +436,13 @@ if __name__=="__main__":
         print_locked("\n\nProgram Name With Path:\n\n" + str(sys.argv[0]), end="\n\n\n")
         
         #   Clear the terminal  #
+        flush_log()
         os.system("clear")
         
-        #   Initiate lock object    #
-        lock = multiprocessing.Lock()
-
-        #   Initiate pool objects   #
-        pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        
         #   Call the main program   #
         start = datetime.datetime.now()
         main()
         print_locked("\nProgram execution time:\t\t", datetime.datetime.now() - start, "hours\n")
-        
-        #   Close Pool object    #
-        pool.close()
 
     except Exception:
     
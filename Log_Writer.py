@@ -0,0 +1,173 @@
+#Program:   Surplus Food Redistribution Log Writer
+#Inputs:    Log records of the running script
+#Outputs:   _Log_File.txt and _Log_Records.jsonl in the log location
+#Author:    Surja Sanyal
+#Date:      29 DEC 2020
+#Comments:  Shared by the simulation, graph, benchmark and service scripts, which set LOG_LEVEL and LOG_LOCATION
+
+
+
+
+##   Start of Code   ##
+
+
+#   Imports    #
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import traceback
+import threading
+import multiprocessing
+
+
+
+
+##  Global environment   ##
+
+#   Set by the importing script   #
+LOG_LEVEL			= "INFO"												#Lowest level of log records written
+LOG_LOCATION		= os.path.dirname(sys.argv[0]) + "/"					#Log file location
+
+#   Do not change   #
+LOG_LEVELS			= ["DEBUG", "INFO", "WARNING", "ERROR"]					#Log levels in order
+LOG_BATCH			= 256													#Log records written per batch
+LOG_FLUSH_SECONDS	= 0.05													#Log batching wait
+LOG_QUEUE			= None													#Log record queue
+LOG_WRITER			= None													#Log writer thread
+LOG_OWNER			= None													#Process owning the log writer
+
+
+
+
+##  Function definitions    ##
+
+
+#   Print through the log writer    #
+def print_locked(*content, sep=" ", end="\n", level="INFO"):
+
+	if LOG_LEVELS.index(level) < LOG_LEVELS.index(LOG_LEVEL):
+
+		return
+
+	get_log_queue().put((level, sep.join([str(piece) for piece in content]) + end, None))
+
+
+#   Log a structured record    #
+def log_record(level, event, **fields):
+
+	if LOG_LEVELS.index(level) < LOG_LEVELS.index(LOG_LEVEL):
+
+		return
+
+	get_log_queue().put((level, None, dict(fields, event = event, time = time.time(), pid = os.getpid())))
+
+
+#   Start the log writer on first use    #
+def get_log_queue():
+
+	global LOG_QUEUE, LOG_WRITER, LOG_OWNER
+
+	if LOG_QUEUE is None:
+
+		LOG_QUEUE, LOG_OWNER = multiprocessing.JoinableQueue(), os.getpid()
+		LOG_WRITER = threading.Thread(target=write_log_records, args=(LOG_QUEUE, ), daemon=True)
+		LOG_WRITER.start()
+		atexit.register(close_log)
+
+	return LOG_QUEUE
+
+
+#   Write queued log records in batches    #
+def write_log_records(log_queue):
+
+	store = LOG_LOCATION
+	running = True
+
+	while running:
+
+		records = [log_queue.get()]
+
+		while len(records) < LOG_BATCH:
+
+			try:
+
+				records.append(log_queue.get(timeout = LOG_FLUSH_SECONDS))
+
+			except queue.Empty:
+
+				break
+
+		texts, structured = [], []
+
+		for record in records:
+
+			if record is None:
+
+				running = False
+				continue
+
+			level, text, fields = record
+
+			if fields is not None:
+
+				structured.append(json.dumps(dict(fields, level = level)) + "\n")
+
+				if LOG_LEVELS.index(level) < LOG_LEVELS.index("WARNING"):
+
+					continue
+
+				text = level + " " + fields['event'] + " " + " ".join([key + "=" + str(value) for key, value in fields.items() if key not in ['event', 'time', 'pid']]) + "\n"
+
+			texts.append(text)
+
+		#   One console write and one append per file for the whole batch    #
+		try:
+
+			print ("".join(texts), end = "", flush = True)
+
+			with open(store + "_Log_File.txt", "a") as log_file:
+
+				log_file.write("".join(texts))
+
+			if len(structured) > 0:
+
+				with open(store + "_Log_Records.jsonl", "a") as record_file:
+
+					record_file.write("".join(structured))
+
+		except OSError:
+
+			traceback.print_exc()
+
+		finally:
+
+			for record in records:
+
+				log_queue.task_done()
+
+
+#   Wait until queued log records are written    #
+def flush_log():
+
+	if LOG_QUEUE is not None:
+
+		LOG_QUEUE.join()
+
+
+#   Flush and stop the log writer    #
+def close_log():
+
+	global LOG_QUEUE
+
+	if LOG_QUEUE is not None and LOG_OWNER == os.getpid():
+
+		LOG_QUEUE.put(None)
+		LOG_WRITER.join()
+		LOG_QUEUE = None
+
+
+##   End of Code   ##
@@ -0,0 +1,510 @@
+#Program:   Surplus Food Matching Service
+#Inputs:    Agent requests over a local Unix socket, or saved agent requests to replay
+#Outputs:   Matches on request, replay latency and throughput in the log file
+#Author:    Surja Sanyal
+#Date:      29 DEC 2020
+#Comments:  Serve with "Matching_Service.py", replay saved agent requests against it with "Matching_Service.py replay"
+
+
+
+
+##   Start of Code   ##
+
+
+#   Imports    #
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import datetime
+import traceback
+import numpy as np
+import Food_Surplus as fs
+
+
+
+
+##  Global environment   ##
+
+#   Customize here  #
+SOCKET_FILE				= "_matching_service.sock"	#File name						Unix socket of the service in the data store location
+PRELOAD					= "OFF"					#ON/OFF								Load the saved agent requests at start
+BATCH_WINDOW_MS			= 50					#Number								Wait for more requests before a matching round
+EXPIRY					= "ON"					#ON/OFF								Drop donors and receivers whose availability ended before the latest arrival
+REPLAY_SPEED			= 0						#Number								Simulated hours replayed per second (0 replays as fast as possible)
+CONNECTIONS				= 32					#Number								Concurrent replay client connections
+CANCEL_RATE				= 5						#Percentage							Replayed requests cancelled after their query
+
+
+
+##  Function definitions    ##
+
+
+#   Print with lock    #
+def print_locked(*content, sep=" ", end="\n"):
+
+    fs.print_locked(*content, sep = sep, end = end)
+
+
+#	Resident matching state	#
+class MatchingService:
+
+	def __init__(self, expiry):
+		self.expiry		= expiry					#Expire donors and receivers
+		self.agents		= {}						#Every agent request received
+		self.indexes	= fs.build_indexes([], [])	#Live agents and volunteer corridors
+		self.pool		= []						#Live agents in arrival order
+		self.pending	= []						#Agents waiting for the next round
+		self.cancelled	= []						#Cancellations waiting for the running round
+		self.status		= {}						#Request status per agent
+		self.matches	= {}						#Match per matched donor and receiver
+		self.waiters	= {}						#Add replies waiting for a round
+		self.clock		= 0							#Latest arrival time
+		self.rounds		= 0							#Matching rounds run
+		self.matching	= False						#Matching round running
+		self.arrived	= asyncio.Event()			#Requests waiting for a round
+
+	#	Add an agent request and reply after its matching round	#
+	async def add(self, details):
+
+		agent = fs.Agent(*details)
+
+		if agent.agentid in self.agents:
+
+			return {'ok': False, 'agentid': agent.agentid, 'error': 'duplicate agent'}
+
+		self.agents[agent.agentid] = agent
+		self.pending.append(agent)
+		self.status[agent.agentid] = 'pending'
+		self.waiters[agent.agentid] = asyncio.get_running_loop().create_future()
+		self.arrived.set()
+
+		return await self.waiters[agent.agentid]
+
+	#	Cancel an agent request, after the running round if any	#
+	def cancel(self, agentid):
+
+		if agentid not in self.agents:
+
+			return {'ok': False, 'agentid': agentid, 'error': 'unknown agent'}
+
+		if self.matching:
+
+			self.cancelled.append(agentid)
+
+			return {'ok': True, 'agentid': agentid, 'status': 'cancelling'}
+
+		self.apply_cancel(agentid)
+
+		return self.query(agentid)
+
+	#	Get the status and match of an agent request	#
+	def query(self, agentid):
+
+		if agentid not in self.agents:
+
+			return {'ok': False, 'agentid': agentid, 'error': 'unknown agent'}
+
+		return {'ok': True, 'agentid': agentid, 'status': self.status[agentid], 'match': self.matches.get(agentid)}
+
+	#	Get service counts	#
+	def get_stats(self):
+
+		statuses = {}
+
+		for status in self.status.values():
+
+			statuses[status] = statuses.get(status, 0) + 1
+
+		return {'ok': True, 'agents': len(self.agents), 'live': len(self.pool), 'pending': len(self.pending), 'rounds': self.rounds, 'statuses': statuses}
+
+	#	Move agents into the live pool	#
+	def admit(self, arriving):
+
+		for agent in arriving:
+
+			agent.m_pref, agent.vicinity, agent.route = agent.pref, -1, []
+			self.status[agent.agentid] = 'available' if agent.agenttype == 'V' else 'unmatched'
+
+		self.pool.extend(arriving)
+		fs.update_indexes(self.indexes, arriving, [])
+
+	#	Remove agents from the live pool	#
+	def remove(self, leaving, status):
+
+		leaving = set([agentid for agentid in leaving if agentid in self.indexes['agents']])
+
+		if len(leaving) > 0:
+
+			self.pool = [agent for agent in self.pool if agent.agentid not in leaving]
+			fs.update_indexes(self.indexes, [], leaving)
+
+		for agentid in leaving:
+
+			self.status[agentid] = status
+
+	#	Cancel a request, returning its match partners to the pool	#
+	def apply_cancel(self, agentid):
+
+		status = self.status[agentid]
+
+		if status == 'pending':
+
+			self.pending = [agent for agent in self.pending if agent.agentid != agentid]
+
+		elif status in ['unmatched', 'available', 'depleted']:
+
+			self.remove([agentid], 'cancelled')
+
+		#	Matches carried by the agent	#
+		broken = [the_tuple for the_tuple in set(self.matches.values()) if agentid in the_tuple]
+
+		for the_tuple in broken:
+
+			for partner in (the_tuple[0], the_tuple[-1]):
+
+				self.matches.pop(partner, None)
+
+				if partner != agentid and self.status[partner] == 'matched':
+
+					self.admit([self.agents[partner]])
+					self.arrived.set()
+
+			#	Give the volunteer its delivery back	#
+			if len(the_tuple) == 3 and the_tuple[1] != agentid:
+
+				volunteer_agent = self.agents[the_tuple[1]]
+
+				if volunteer_agent.agentid in self.indexes['agents']:
+
+					volunteer_agent.amount = volunteer_agent.amount + fs.Tm
+
+				else:
+
+					self.admit([volunteer_agent])
+
+		self.status[agentid] = 'cancelled'
+
+		if agentid in self.waiters:
+
+			self.waiters.pop(agentid).set_result(self.query(agentid))
+
+	#	Rematch the whole live pool with the agents that arrived	#
+	async def run_round(self):
+
+		arriving, self.pending = self.pending, []
+		self.clock = max([self.clock] + [agent.startt for agent in arriving])
+		self.admit(arriving)
+
+		#	Availability over before the latest arrival	#
+		if self.expiry == 'ON':
+
+			self.remove([agent.agentid for agent in self.pool if agent.agenttype != 'V' and agent.endt < self.clock], 'expired')
+
+		#	Unmatched agents of earlier rounds can pair with arrivals, so every round recomputes the pool	#
+		C = list(self.pool)
+		PFD, PFR, NPFD, NPFR, V = fs.classify_agents(C)
+		amounts = {volunteer: self.agents[volunteer].amount for volunteer in V}
+		start = time.perf_counter()
+		self.matching = True
+
+		try:
+
+			Mp, PFD, PFR, Mnp, NPFD, NPFR, V = await asyncio.get_running_loop().run_in_executor(None, fs.match_food_classes,
+																								C, PFD, PFR, NPFD, NPFR, V, self.indexes)
+
+		finally:
+
+			self.matching = False
+
+		#	Record matches and volunteers out of capacity	#
+		for the_tuple in Mp + Mnp:
+
+			self.matches[the_tuple[0]] = self.matches[the_tuple[-1]] = the_tuple
+
+		self.remove([agentid for the_tuple in Mp + Mnp for agentid in (the_tuple[0], the_tuple[-1])], 'matched')
+
+		#	Single trips charge every donor given a volunteer, so only the committed deliveries are charged again	#
+		if fs.ROUTING != 'CAPACITATED':
+
+			for volunteer, amount in amounts.items():
+
+				self.agents[volunteer].amount = amount
+
+			depleted = set([the_tuple[1] for the_tuple in Mp + Mnp if len(the_tuple) == 3 and not fs.charge_volunteer(self.agents[the_tuple[1]])])
+			V = [volunteer for volunteer in amounts if volunteer not in depleted]
+
+		available = set(V)
+		self.remove([agent.agentid for agent in C if agent.agenttype == 'V' and agent.agentid not in available], 'depleted')
+
+		#	Unmatched donors and receivers start the next round afresh	#
+		for agent in self.pool:
+
+			if agent.agenttype != 'V':
+
+				agent.m_pref, agent.vicinity = agent.pref, -1
+
+		self.rounds = self.rounds + 1
+		fs.log_record("DEBUG", "service_round", live = len(C), arrived = len(arriving), matched = len(Mp) + len(Mnp),
+						seconds = round(time.perf_counter() - start, 4))
+
+		#	Cancellations received during the round	#
+		cancelled, self.cancelled = self.cancelled, []
+
+		for agentid in cancelled:
+
+			self.apply_cancel(agentid)
+
+		#	Reply to the arrivals	#
+		for agent in arriving:
+
+			if agent.agentid in self.waiters:
+
+				self.waiters.pop(agent.agentid).set_result(self.query(agent.agentid))
+
+	#	Run matching rounds as requests arrive	#
+	async def run(self, window):
+
+		while True:
+
+			await self.arrived.wait()
+			await asyncio.sleep(window/1000)
+			self.arrived.clear()
+
+			try:
+
+				await self.run_round()
+
+			except Exception:
+
+				print_locked(traceback.format_exc())
+
+				for agentid in list(self.waiters):
+
+					self.waiters.pop(agentid).set_result({'ok': False, 'agentid': agentid, 'error': 'matching failed'})
+
+	#	Serve the requests of one connection	#
+	async def serve(self, reader, writer):
+
+		try:
+
+			while True:
+
+				line = await reader.readline()
+
+				if not line:
+
+					break
+
+				operation = 'invalid'
+
+				try:
+
+					request = json.loads(line)
+					operation = str(request.get('op'))
+
+					if operation == 'add':
+
+						reply = await self.add(request['agent'])
+
+					elif operation == 'cancel':
+
+						reply = self.cancel(request['agentid'])
+
+					elif operation == 'query':
+
+						reply = self.query(request['agentid'])
+
+					elif operation == 'stats':
+
+						reply = self.get_stats()
+
+					else:
+
+						reply = {'ok': False, 'error': 'unknown operation'}
+
+				except (ValueError, KeyError, TypeError, AttributeError) as error:
+
+					reply = {'ok': False, 'error': repr(error)}
+
+				fs.add_metric('service_requests_total', operation = operation)
+				writer.write((json.dumps(reply) + "\n").encode())
+				await writer.drain()
+
+		except ConnectionError:
+
+			pass
+
+		finally:
+
+			writer.close()
+
+
+#	Serve matching requests on a Unix socket	#
+async def serve_matching(socket_file, window, preload, expiry):
+
+	service = MatchingService(expiry)
+	fs.start_metrics()
+
+	#	Rounds already rematch the pool, a maximum matching per round would double their cost	#
+	fs.BOUND = 'OFF'
+
+	#	Warm start from the saved agent requests	#
+	if preload == 'ON':
+
+		for C in fs.read_agent_chunks(fs.get_chunk_size(math.inf)):
+
+			service.agents.update({agent.agentid: agent for agent in C})
+			service.admit(C)
+
+		await service.run_round()
+		print_locked("\nPreloaded:\t\t\t", len(service.agents), "agents,", len(service.matches) // 2, "matched")
+
+	if os.path.exists(socket_file):
+
+		os.remove(socket_file)
+
+	server = await asyncio.start_unix_server(service.serve, path = socket_file)
+	matcher = asyncio.create_task(service.run(window))
+	print_locked("\nMatching service listening on", socket_file)
+
+	try:
+
+		async with server:
+
+			await server.serve_forever()
+
+	finally:
+
+		matcher.cancel()
+
+		if os.path.exists(socket_file):
+
+			os.remove(socket_file)
+
+
+#	Send a request on a pooled connection and time it	#
+async def send_request(connections, request, latencies):
+
+	reader, writer = await connections.get()
+
+	try:
+
+		start = time.perf_counter()
+		writer.write((json.dumps(request) + "\n").encode())
+		await writer.drain()
+		reply = json.loads(await reader.readline())
+		latencies.setdefault(request['op'], []).append(time.perf_counter() - start)
+
+	finally:
+
+		connections.put_nowait((reader, writer))
+
+	return reply
+
+
+#	Replay one agent request: add, query and sometimes cancel	#
+async def replay_agent(connections, agent, delay, cancel_rate, latencies, outcomes):
+
+	await asyncio.sleep(delay)
+	await send_request(connections, {'op': 'add', 'agent': agent.get_details()}, latencies)
+	reply = await send_request(connections, {'op': 'query', 'agentid': agent.agentid}, latencies)
+
+	if random.random() < cancel_rate/100:
+
+		reply = await send_request(connections, {'op': 'cancel', 'agentid': agent.agentid}, latencies)
+
+	outcomes[reply.get('status', 'error')] = outcomes.get(reply.get('status', 'error'), 0) + 1
+
+
+#	Replay saved agent requests in arrival order and report latency and throughput	#
+async def replay_requests(socket_file, speed, num_connections, cancel_rate):
+
+	agents = [agent for C in fs.read_agent_chunks(fs.get_chunk_size(math.inf)) for agent in C]
+	agents.sort(key = lambda agent: (agent.startt, agent.agentid))
+	first = agents[0].startt if len(agents) > 0 else 0
+	connections = asyncio.Queue()
+	latencies, outcomes = {}, {}
+
+	for connection in range(num_connections):
+
+		connections.put_nowait(await asyncio.open_unix_connection(socket_file))
+
+	print_locked("\nREPLAY:\t\t\t\t", len(agents), "agents,", num_connections, "connections,", (str(speed) + " hours/s") if speed > 0 else "as fast as possible")
+
+	start = time.perf_counter()
+	await asyncio.gather(*[replay_agent(connections, agent, (agent.startt - first)/speed if speed > 0 else 0, cancel_rate, latencies, outcomes)
+							for agent in agents])
+	elapsed = time.perf_counter() - start
+	stats = await send_request(connections, {'op': 'stats'}, {})
+
+	for operation, timings in latencies.items():
+
+		p50, p90, p99 = np.percentile(timings, [50, 90, 99]) * 1000
+		print_locked(operation + ":\t\t\t\t", len(timings), "requests, p50", round(p50, 2), "ms, p90", round(p90, 2), "ms, p99", round(p99, 2), "ms, max",
+						round(max(timings) * 1000, 2), "ms")
+
+	print_locked("Throughput:\t\t\t", round(sum([len(timings) for timings in latencies.values()])/elapsed, 1), "requests/s,",
+					round(len(agents)/elapsed, 1), "agents/s over", round(elapsed, 2), "s")
+	print_locked("Outcomes:\t\t\t", ", ".join([status + " " + str(count) for status, count in sorted(outcomes.items())]))
+	print_locked("Service:\t\t\t", stats['rounds'], "rounds,", stats['live'], "live agents")
+
+	while not connections.empty():
+
+		reader, writer = connections.get_nowait()
+		writer.close()
+
+
+
+##  The main function   ##
+
+#   Main    #
+def main():
+
+	role = sys.argv[1].upper() if len(sys.argv) > 1 else "SERVE"
+	socket_file = fs.DATA_STORE_LOCATION + SOCKET_FILE
+
+	if role == "REPLAY":
+
+		asyncio.run(replay_requests(socket_file, REPLAY_SPEED, CONNECTIONS, CANCEL_RATE))
+
+	else:
+
+		try:
+
+			asyncio.run(serve_matching(socket_file, BATCH_WINDOW_MS, PRELOAD, EXPIRY))
+
+		except KeyboardInterrupt:
+
+			print_locked("\nMatching service stopped.")
+
+
+
+##  Call the main function  ##
+
+#   Initiation  #
+if __name__=="__main__":
+
+    try:
+
+        #   Start logging to file     #
+        print_locked('\n\n\n\n{:.{align}{width}}'.format("Execution Start at: "
+            + str(datetime.datetime.now()), align='<', width=70), end="\n\n")
+
+        print_locked("\n\nProgram Name:\n\n" + str(sys.argv[0].split("/")[-1]))
+
+        #   Call the main program   #
+        start = datetime.datetime.now()
+        main()
+        print_locked("\nProgram execution time:\t\t", datetime.datetime.now() - start, "hours\n")
+
+    except Exception:
+
+        print_locked(traceback.format_exc())
+
+
+##   End of Code   ##
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Log_Writer
+import Food_Surplus as fs
+
+
+#	Keep run outputs out of the repository	#
+@pytest.fixture(autouse = True)
+def data_store(tmp_path, monkeypatch):
+
+	monkeypatch.setattr(fs, 'DATA_STORE_LOCATION', str(tmp_path) + "/")
+	monkeypatch.setattr(Log_Writer, 'LOG_LOCATION', str(tmp_path) + "/")
+
+	return tmp_path
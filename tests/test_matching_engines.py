@@ -0,0 +1,131 @@
+import copy
+import random
+
+import pytest
+
+import Food_Surplus as fs
+
+
+#	Agents of one food class with volunteers assigned and preferences updated	#
+def get_prepared_class(num_requests, seed):
+
+	random.seed(seed)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(num_requests, save = False)
+	M = []
+	fs.assign_volunteers(C, NPFD, V, M, '')
+	fs.update_preferences(C, NPFD, NPFR, M)
+
+	return C, NPFD, NPFR, M
+
+
+#	Largest matching by simple augmenting paths	#
+def get_reference_matching(indptr, indices, columns):
+
+	match_column = [-1] * columns
+
+	def augment(row, seen):
+
+		for column in indices[indptr[row]:indptr[row + 1]]:
+
+			if column not in seen:
+
+				seen.add(column)
+
+				if match_column[column] < 0 or augment(match_column[column], seen):
+
+					match_column[column] = row
+					return True
+
+		return False
+
+	return sum([1 for row in range(len(indptr) - 1) if augment(row, set())])
+
+
+@pytest.mark.parametrize('proposer', ['RECEIVER', 'DONOR'])
+@pytest.mark.parametrize('seed', [3, 7, 11])
+def test_deferred_acceptance_is_stable(proposer, seed):
+
+	C, D, R, M = get_prepared_class(800, seed)
+	agents = {agent.agentid: agent for agent in C}
+	receiver_lists = {receiver: list(dict.fromkeys(agent for agent in agents[receiver].m_pref if agent in set(D))) for receiver in R}
+	donor_ranks = {donor: {agent: i for i, agent in reversed(list(enumerate(agents[donor].m_pref)))} for donor in D}
+
+	M = fs.match_deferred_acceptance(C, list(D), list(R), list(M), proposer = proposer)[0]
+	partner = {}
+
+	for the_tuple in M:
+
+		if len(the_tuple) > 1 and the_tuple[-1] in receiver_lists:
+
+			partner[the_tuple[0]], partner[the_tuple[-1]] = the_tuple[-1], the_tuple[0]
+
+	assert len(partner) > 0
+
+	#	No receiver and listed donor both prefer each other to their partners	#
+	for receiver, receiver_list in receiver_lists.items():
+
+		for donor in receiver_list:
+
+			if partner.get(receiver) == donor:
+
+				break
+
+			donor_partner = partner.get(donor)
+
+			assert donor_partner is not None and (fs.get_donor_rank(donor_ranks[donor], agents[donor_partner], fs.SORTING)
+													< fs.get_donor_rank(donor_ranks[donor], agents[receiver], fs.SORTING))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_maximum_matching_cardinality(seed):
+
+	generator = random.Random(seed)
+	rows, columns = generator.randint(1, 30), generator.randint(1, 30)
+	indptr, indices = [0], []
+
+	for row in range(rows):
+
+		indices.extend(generator.sample(range(columns), generator.randint(0, min(columns, 4))))
+		indptr.append(len(indices))
+
+	match_row = fs.get_maximum_matching(indptr, indices, columns)
+	matched = [column for column in match_row if column >= 0]
+
+	assert len(matched) == len(set(matched))
+	assert all([column in indices[indptr[row]:indptr[row + 1]] for row, column in enumerate(match_row) if column >= 0])
+	assert len(matched) == get_reference_matching(indptr, indices, columns)
+
+
+def test_maximum_engine_matches_at_least_greedy(monkeypatch):
+
+	random.seed(7)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(800, save = False)
+	allocation = {}
+
+	for engine in ['GREEDY', 'MAXIMUM']:
+
+		monkeypatch.setattr(fs, 'MATCHING', engine)
+		Mp, run_PFD, run_PFR, Mnp, run_NPFD, run_NPFR, run_V = fs.match_food_classes(*copy.deepcopy((C, PFD, PFR, NPFD, NPFR, V)))
+		allocation[engine] = len(Mp) + len(Mnp)
+
+	assert allocation['MAXIMUM'] >= allocation['GREEDY']
+
+
+@pytest.mark.parametrize('preference', ['ORIGINAL', 'ELIGIBLE'])
+@pytest.mark.parametrize('sorting', ['START', 'END'])
+def test_bitset_and_list_eligibility_agree(monkeypatch, preference, sorting):
+
+	random.seed(7)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(800, save = False)
+	monkeypatch.setattr(fs, 'PREFERENCE', preference)
+	monkeypatch.setattr(fs, 'SORTING', sorting)
+	results = {}
+
+	for eligibility in ['LIST', 'BITSET']:
+
+		monkeypatch.setattr(fs, 'ELIGIBILITY', eligibility)
+		run = copy.deepcopy((C, PFD, PFR, NPFD, NPFR, V))
+		matches = fs.match_food_classes(*run)
+		results[eligibility] = (matches, {agent.agentid: (agent.m_pref, agent.vicinity, agent.amount) for agent in run[0]})
+
+	assert results['LIST'] == results['BITSET']
@@ -0,0 +1,50 @@
+import asyncio
+
+import Food_Surplus as fs
+import Matching_Service as ms
+
+
+#	Run matching rounds on a service with the given arrivals	#
+async def run_rounds(arrivals, rounds):
+
+	service = ms.MatchingService('OFF')
+
+	for agent in arrivals:
+
+		service.agents[agent.agentid] = agent
+		service.status[agent.agentid] = 'pending'
+
+	service.pending = list(arrivals)
+	amounts = []
+
+	for round_number in range(rounds):
+
+		await service.run_round()
+		amounts.append(service.agents[1].amount)
+
+	return service, amounts
+
+
+def test_unmatched_donor_does_not_use_volunteer_capacity():
+
+	volunteer = fs.Agent(1, 'V', '', 5, 0, 0, 0, 24, [], endx = 100, endy = 0, transtype = 'MOTORED', transac = 'AC')
+	donor = fs.Agent(2, 'D', 'NP', 1, 1, 1, 1, 5, [3])
+
+	service, amounts = asyncio.run(run_rounds([volunteer, donor], 4))
+
+	assert amounts == [5, 5, 5, 5]
+	assert service.status[1] != 'depleted'
+	assert service.status[2] != 'matched'
+
+
+def test_matched_donor_uses_volunteer_capacity():
+
+	volunteer = fs.Agent(1, 'V', '', 5, 0, 0, 0, 24, [], endx = 100, endy = 0, transtype = 'MOTORED', transac = 'AC')
+	donor = fs.Agent(2, 'D', 'NP', 1, 1, 1, 1, 5, [3])
+	receiver = fs.Agent(3, 'R', 'NP', 1, 2, 2, 6, 12, [2])
+	distant_receiver = fs.Agent(4, 'R', 'NP', 1, 900, 900, 6, 12, [])
+
+	service, amounts = asyncio.run(run_rounds([volunteer, donor, receiver, distant_receiver], 2))
+
+	assert service.matches[2] == (2, 1, 3)
+	assert amounts == [5 - fs.Tm, 5 - fs.Tm]
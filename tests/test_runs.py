@@ -0,0 +1,77 @@
+import copy
+import random
+
+import pytest
+
+import Food_Surplus as fs
+
+
+class Interrupted(Exception):
+	pass
+
+
+#	Agents and matches of a full matching run	#
+def get_run_state(run):
+
+	matches = fs.match_food_classes(*run)
+
+	return matches, {agent.agentid: (agent.m_pref, agent.vicinity, agent.amount, agent.route) for agent in run[0]}
+
+
+@pytest.mark.parametrize('routing', ['SINGLE', 'CAPACITATED'])
+def test_checkpoint_resume_matches_clean_run(monkeypatch, data_store, routing):
+
+	random.seed(7)
+	agents = fs.generate_and_classify_agents(800, save = False)
+	monkeypatch.setattr(fs, 'ROUTING', routing)
+	monkeypatch.setattr(fs, 'CHECKPOINT_INTERVAL', 2)
+	clean = get_run_state(copy.deepcopy(agents))
+
+	#	Stop the perishable pass after its second snapshot	#
+	save_matching_checkpoint = fs.save_matching_checkpoint
+
+	def interrupt(agents, Food, M, D, R, V, capacity, cursor, complete = False):
+
+		save_matching_checkpoint(agents, Food, M, D, R, V, capacity, cursor, complete)
+
+		if cursor >= 4 and not complete:
+
+			raise Interrupted()
+
+	monkeypatch.setattr(fs, 'CHECKPOINT', 'ON')
+	monkeypatch.setattr(fs, 'save_matching_checkpoint', interrupt)
+
+	with pytest.raises(Interrupted):
+
+		fs.match_food_classes(*copy.deepcopy(agents))
+
+	assert len(list(data_store.glob("_checkpoint_matching_*.bin"))) == 1
+
+	#	Restart from the saved requests	#
+	monkeypatch.setattr(fs, 'save_matching_checkpoint', save_matching_checkpoint)
+	monkeypatch.setattr(fs, 'RESUME', 'ON')
+
+	assert get_run_state(copy.deepcopy(agents)) == clean
+
+
+def test_nested_availability_matches_independent_runs(data_store):
+
+	random.seed(7)
+	C, PFD, PFR, NPFD, NPFR, V = fs.generate_and_classify_agents(800, save = False)
+	order, levels = random.sample(V, len(V)), ['1X', '4X', '32X']
+
+	fs.run_availability(*copy.deepcopy((C, PFD, PFR, NPFD, NPFR)), order, levels)
+
+	with open(str(data_store) + "/_availability.txt", "r") as fp:
+
+		curve = [[float(value) for value in line.split("\t")] for line in fp.read().splitlines()]
+
+	assert len(curve) == len(levels) and curve[0][1] < curve[-1][1]
+
+	for level, row in zip(levels, curve):
+
+		count = int(len(order) * round(fs.get_v_settings(level)/fs.get_v_settings('32X'), 5))
+		Mp, run_PFD, run_PFR, Mnp, run_NPFD, run_NPFR, run_V = fs.match_food_classes(*copy.deepcopy((C, PFD, PFR, NPFD, NPFR)), order[:count])
+
+		assert row[1:4] == [round(100 * (len(Mp) + len(Mnp))/max(len(PFD) + len(NPFD), 1), 2),
+							round(100 * len(Mp)/max(len(PFD), 1), 2), round(100 * len(Mnp)/max(len(NPFD), 1), 2)]